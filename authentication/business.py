@@ -1,8 +1,10 @@
 import jwt
+from asgiref.sync import sync_to_async
 from jwt import ExpiredSignatureError, InvalidTokenError
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from helpers.jwt_key_service import PublicKeyCache
+from catalog.authentication.token_cache import prepared_key, token_cache, verification_stats
 
 
 class SSOBusinessTokenAuthentication(BaseAuthentication):
@@ -19,16 +21,21 @@ class SSOBusinessTokenAuthentication(BaseAuthentication):
 
         try:
             key_info = PublicKeyCache.get_public_key()
-            secret_key = key_info["key"]
+            key_id, secret_key = prepared_key.get(key_info["key"], key_info["algorithm"])
             algorithm = key_info["algorithm"]
-            # print(key_info,"==================")
-            # Decode JWT without verifying audience (you can add it later if needed)
-            decoded = jwt.decode(
-                token,
-                secret_key,
-                algorithms=[algorithm],
-                
-            )
+
+            decoded = token_cache.get(token, key_id)
+            if decoded is None:
+                # Decode JWT without verifying audience (you can add it later if needed)
+                decoded = jwt.decode(
+                    token,
+                    secret_key,
+                    algorithms=[algorithm],
+                )
+                verification_stats.verified()
+                token_cache.set(token, key_id, decoded)
+            else:
+                verification_stats.hit()
 
             # print(decoded, "==================")
             # Only allow business user type
@@ -52,6 +59,13 @@ class SSOBusinessTokenAuthentication(BaseAuthentication):
         except Exception as e:
             raise AuthenticationFailed(f"Token verification failed: {e}")
 
+    async def aauthenticate(self, request):
+        """
+        Async authenticate() for the async views. The public key fetch and the signature
+        check can block, so they run in a worker thread instead of on the event loop.
+        """
+        return await sync_to_async(self.authenticate, thread_sensitive=False)(request)
+
 
 class AuthenticatedBusinessUser:
     """
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from jwt.algorithms import get_default_algorithms
+
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 300
+RATE_WINDOW = 60
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified JWT claims, keyed by a hash of the token and the signing key.
+
+    An entry never outlives the token's `exp` nor `ttl` seconds, and a key rotation
+    makes every entry verified with the old key unreachable. Unless given, the size and
+    ttl are read from CATALOG_JWT_CACHE_SIZE and CATALOG_JWT_CACHE_TTL on every use.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, "CATALOG_JWT_CACHE_SIZE", TOKEN_CACHE_SIZE)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "CATALOG_JWT_CACHE_TTL", TOKEN_CACHE_TTL)
+
+    @staticmethod
+    def _key(token, key_id):
+        return hashlib.sha256(f"{key_id}:{token}".encode()).digest()
+
+    def get(self, token, key_id):
+        key = self._key(token, key_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token, key_id, claims):
+        expires_at = time.time() + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        key = self._key(token, key_id)
+        maxsize = self.maxsize
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PreparedKey:
+    """Parse the public key once per rotation instead of on every jwt.decode()."""
+
+    def __init__(self):
+        self._current = None
+        self._lock = threading.Lock()
+
+    def get(self, key, algorithm):
+        """Return (key id, parsed key) for the key material returned by PublicKeyCache."""
+        raw = key if isinstance(key, bytes) else str(key).encode()
+        key_id = hashlib.sha256(raw + algorithm.encode()).hexdigest()
+        current = self._current
+        if current is None or current[0] != key_id:
+            with self._lock:
+                current = (key_id, get_default_algorithms()[algorithm].prepare_key(key))
+                self._current = current
+        return current
+
+
+class VerificationStats:
+    """Count signature verifications and cache hits, with a per-second rate over the last minute."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.verifications = 0
+        self.cache_hits = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._recent and self._recent[0] <= now - self.window:
+            self._recent.popleft()
+
+    def verified(self):
+        now = time.monotonic()
+        with self._lock:
+            self.verifications += 1
+            self._recent.append(now)
+            self._trim(now)
+
+    def hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "verifications": self.verifications,
+                "cache_hits": self.cache_hits,
+                "verifications_per_second": len(self._recent) / self.window,
+            }
+
+
+token_cache = VerifiedTokenCache()
+prepared_key = PreparedKey()
+verification_stats = VerificationStats()
@@ -0,0 +1,186 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from catalog import sharding
+
+CACHE_TIMEOUT = 300
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.5
+LOCK_POLL = 0.025
+
+_MISSING = object()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", CACHE_TIMEOUT)
+
+
+def enabled():
+    """Whether read_through caches anything; CATALOG_CACHE_TIMEOUT = 0 turns it off."""
+    return bool(_timeout())
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_stats():
+    """Return the hit/miss counters of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _generation_key(business_id):
+    return f"catalog:{business_id}:generation"
+
+
+def get_generation(business_id):
+    """Return the current cache generation of a business."""
+    cache = _cache()
+    key = _generation_key(business_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so an evicted counter never comes back to an old value.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation(business_id):
+    """Async get_generation()."""
+    cache = _cache()
+    key = _generation_key(business_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def _bump(business_id):
+    cache = _cache()
+    key = _generation_key(business_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate(business_id):
+    """
+    Drop every cached read of a business by moving it to a new generation.
+    Runs after the current transaction commits, so readers cannot re-cache old rows.
+    The in-process search indexes watch the generation too, so it moves even when
+    caching is off.
+    """
+    transaction.on_commit(functools.partial(_bump, business_id), using=sharding.db_for_read(business_id))
+
+
+def read_through(name):
+    """
+    Cache the result of a service read per business generation.
+
+    The wrapped function, sync or async, must take a `business_id` argument. Concurrent
+    misses on the same key wait briefly for the first caller to fill it instead of all
+    hitting the database.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def key_parts(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.blake2b(repr(sorted(bound.arguments.items())).encode(), digest_size=16).hexdigest()
+            return bound.arguments["business_id"], digest
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timeout = _timeout()
+                if not timeout:
+                    return await func(*args, **kwargs)
+
+                business_id, digest = key_parts(args, kwargs)
+                key = f"catalog:{business_id}:{await aget_generation(business_id)}:{name}:{digest}"
+
+                cache = _cache()
+                value = await cache.aget(key, _MISSING)
+                if value is not _MISSING:
+                    _count("hits")
+                    return value
+                _count("misses")
+
+                lock_key = f"{key}:lock"
+                if not await cache.aadd(lock_key, 1, getattr(settings, "CATALOG_CACHE_LOCK_TIMEOUT", LOCK_TIMEOUT)):
+                    _count("lock_waits")
+                    deadline = time.monotonic() + getattr(settings, "CATALOG_CACHE_LOCK_WAIT", LOCK_WAIT)
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(LOCK_POLL)
+                        value = await cache.aget(key, _MISSING)
+                        if value is not _MISSING:
+                            _count("lock_wait_hits")
+                            return value
+                    lock_key = None
+                try:
+                    value = await func(*args, **kwargs)
+                    await cache.aset(key, value, timeout)
+                finally:
+                    if lock_key:
+                        await cache.adelete(lock_key)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timeout = _timeout()
+            if not timeout:
+                return func(*args, **kwargs)
+
+            business_id, digest = key_parts(args, kwargs)
+            key = f"catalog:{business_id}:{get_generation(business_id)}:{name}:{digest}"
+
+            cache = _cache()
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                _count("hits")
+                return value
+            _count("misses")
+
+            lock_key = f"{key}:lock"
+            if not cache.add(lock_key, 1, getattr(settings, "CATALOG_CACHE_LOCK_TIMEOUT", LOCK_TIMEOUT)):
+                _count("lock_waits")
+                deadline = time.monotonic() + getattr(settings, "CATALOG_CACHE_LOCK_WAIT", LOCK_WAIT)
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL)
+                    value = cache.get(key, _MISSING)
+                    if value is not _MISSING:
+                        _count("lock_wait_hits")
+                        return value
+                lock_key = None
+            try:
+                value = func(*args, **kwargs)
+                cache.set(key, value, timeout)
+            finally:
+                if lock_key:
+                    cache.delete(lock_key)
+            return value
+
+        return wrapper
+    return decorator
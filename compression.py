@@ -0,0 +1,90 @@
+import gzip
+
+from django.conf import settings
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_coding_re = _lazy_re_compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+_encoded_etag_re = _lazy_re_compile(r'"([^"]*)-(?:br|gzip)"')
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows, ignoring the ones sent with q=0."""
+    encodings = set()
+    for part in header.split(","):
+        match = _coding_re.match(part)
+        if match is None:
+            continue
+        coding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(coding.lower())
+    return encodings
+
+
+def encoded_etag(etag, encoding):
+    """A strong ETag for the `encoding`-coded body of the representation tagged `etag`."""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encodings(header):
+    """An If-Match or If-None-Match header with the ETags of coded bodies mapped back."""
+    return _encoded_etag_re.sub(r'"\1"', header)
+
+
+def compress(request, response):
+    """
+    Compress a rendered response with brotli (when installed) or gzip if the client
+    accepts it and the body is at least CATALOG_COMPRESS_MIN_BYTES. None turns it off.
+    """
+    min_bytes = getattr(settings, "CATALOG_COMPRESS_MIN_BYTES", COMPRESS_MIN_BYTES)
+    if min_bytes is None or response.streaming or response.has_header("Content-Encoding"):
+        return response
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if len(response.content) < min_bytes:
+        return response
+
+    encodings = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    if brotli is not None and ("br" in encodings or "*" in encodings):
+        encoding = "br"
+        content = brotli.compress(response.content, quality=getattr(settings, "CATALOG_BROTLI_QUALITY", BROTLI_QUALITY))
+    elif "gzip" in encodings or "*" in encodings:
+        encoding = "gzip"
+        content = gzip.compress(response.content, compresslevel=getattr(settings, "CATALOG_GZIP_LEVEL", GZIP_LEVEL), mtime=0)
+    else:
+        return response
+    if len(content) >= len(response.content):
+        return response
+
+    response.content = content
+    response["Content-Length"] = str(len(content))
+    response["Content-Encoding"] = encoding
+    # The encoded body differs byte for byte, so it gets its own strong ETag, which
+    # still satisfies If-Match (see catalog.conditional).
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = encoded_etag(etag, encoding)
+    return response
+
+
+class CompressedResponseMixin:
+    """Compress the rendered response of a DRF view, see compress()."""
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            response.render()
+        return compress(request, response)
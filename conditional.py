@@ -0,0 +1,73 @@
+import functools
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from catalog.compression import strip_encodings
+
+
+def _digest(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def _condition(etag_func, last_modified_func):
+    """condition() that also accepts the ETags compress() gives coded bodies."""
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            for header in ("HTTP_IF_MATCH", "HTTP_IF_NONE_MATCH"):
+                if header in request.META:
+                    request.META[header] = strip_encodings(request.META[header])
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def list_condition(service):
+    """
+    ETag / Last-Modified for a list view, validated by service.get_version(business_id).
+    The query string is part of the ETag, so every page and projection has its own.
+    """
+    def etag(request, *args, **kwargs):
+        version = service.get_version(request.user.business_id)
+        return _digest(version["count"], version.get("category_count"), version["last_modified"], request.META.get("QUERY_STRING", ""))
+
+    def last_modified(request, *args, **kwargs):
+        return service.get_version(request.user.business_id)["last_modified"]
+
+    return method_decorator(_condition(etag, last_modified))
+
+
+def detail_condition(get_object):
+    """
+    ETag / Last-Modified for a detail view, validated by the object's updated_at.
+    On PUT, PATCH and DELETE a stale If-Match answers 412 Precondition Failed; see
+    expected_version() for keeping that true until the write.
+    """
+    def updated_at(obj):
+        category = getattr(obj, "category", None)
+        if category is not None and category.updated_at > obj.updated_at:
+            return category.updated_at
+        return obj.updated_at
+
+    def etag(request, *args, **kwargs):
+        obj = get_object(request, **kwargs)
+        if request.headers.get("If-Match", "*").strip() != "*":
+            request.expected_version = obj.updated_at
+        return _digest(obj.pk, updated_at(obj))
+
+    def last_modified(request, *args, **kwargs):
+        return updated_at(get_object(request, **kwargs))
+
+    return method_decorator(_condition(etag, last_modified))
+
+
+def expected_version(request):
+    """
+    The updated_at of the row an If-Match header was checked against, or None. Pass it
+    to the service update so a write landing after the check still answers 412.
+    """
+    return getattr(request, "expected_version", None)
@@ -0,0 +1,94 @@
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from catalog import sharding
+
+
+class IdSpaceExhausted(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "No free IDs are left."
+    default_code = "id_space_exhausted"
+
+
+class IdAllocator:
+    """
+    Hand out unique public IDs (category_id, product_id) from an IdSequence row.
+
+    The IdSequence row is locked while a range is reserved, so concurrent writers never
+    get the same ID. Outside a transaction, IDs are reserved `block_size` at a time and
+    served from memory. IDs left in a block when the process exits are never used, so
+    keep blocks small for small ID spaces.
+    """
+
+    def __init__(self, sequence, model_name, field, block_size=1):
+        self.sequence = sequence
+        self.model_name = model_name
+        self.field = field
+        self.default_block_size = block_size
+        self._lock = threading.Lock()
+        self._block = []
+
+    @property
+    def block_size(self):
+        return getattr(settings, "CATALOG_ID_BLOCK_SIZE", {}).get(self.sequence, self.default_block_size)
+
+    def next(self):
+        """Return one unused ID."""
+        return self.allocate(1)[0]
+
+    def allocate(self, count):
+        """
+        Return `count` unused IDs in ascending order. Call it before opening the write
+        transaction: inside one, the IdSequence row stays locked until that transaction ends.
+        """
+        if transaction.get_connection(sharding.DIRECTORY_DB).in_atomic_block:
+            # A rollback would also roll back the sequence, so a cached block could be
+            # handed out twice. Reserve exactly what is needed instead.
+            return self.reserve(count)
+        with self._lock:
+            if len(self._block) < count:
+                self._block += self.reserve(max(count - len(self._block), self.block_size))
+            ids, self._block = self._block[:count], self._block[count:]
+        return ids
+
+    def reserve(self, count):
+        """Move the sequence forward and return the next `count` free IDs."""
+        IdSequence = apps.get_model("catalog", "IdSequence")
+        model = apps.get_model("catalog", self.model_name)
+        ids = []
+        with transaction.atomic(using=sharding.DIRECTORY_DB):
+            sequence = IdSequence.objects.using(sharding.DIRECTORY_DB).select_for_update().get(name=self.sequence)
+            while len(ids) < count:
+                start = sequence.next_value
+                end = min(start + count - len(ids), sequence.max_value + 1)
+                if start >= end:
+                    raise IdSpaceExhausted(f"The {self.sequence} ID space is exhausted.")
+                candidates = range(start, end)
+                if start <= sequence.legacy_max:
+                    # Rows created before the sequence existed got random IDs in this range,
+                    # and may have been moved to any shard since.
+                    taken = set()
+                    for db in sharding.shards():
+                        taken.update(
+                            model.objects.using(db).filter(**{f"{self.field}__range": (start, end - 1)})
+                            .values_list(self.field, flat=True)
+                        )
+                    candidates = [value for value in candidates if value not in taken]
+                ids += candidates
+                sequence.next_value = end
+            sequence.save(update_fields=["next_value"])
+        return ids
+
+
+category_ids = IdAllocator("category", "Category", "category_id", block_size=1)
+product_ids = IdAllocator("product", "Product", "product_id", block_size=20)
+# Primary keys of sharded rows come from the directory too, so a row keeps its pk, which
+# the API, ETags and change feed cursors expose, when its business moves to another shard.
+category_pks = IdAllocator("category_pk", "Category", "id", block_size=1)
+product_pks = IdAllocator("product_pk", "Product", "id", block_size=20)
+tombstone_pks = IdAllocator("tombstone_pk", "Tombstone", "id", block_size=20)
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.response import SimpleTemplateResponse
+
+from catalog.authentication.token_cache import verification_stats
+from catalog.cache import get_stats as get_cache_stats
+
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_MAX_QUERIES = 100
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PHASES = ("auth", "db", "view", "render")
+
+logger = logging.getLogger("catalog.slow_requests")
+
+
+class RequestTimings:
+    """Where the time of one request went. Durations are in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.auth = 0.0
+        self.db = 0.0
+        self.render = 0.0
+        self.total = 0.0
+        self.queries = 0
+        self.statements = []
+        self.max_statements = getattr(settings, "CATALOG_SLOW_REQUEST_MAX_QUERIES", SLOW_REQUEST_MAX_QUERIES)
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook timing every query of the request."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db += duration
+            self.queries += 1
+            if len(self.statements) < self.max_statements:
+                self.statements.append((duration, sql))
+
+    @property
+    def view(self):
+        """Time in the handler itself, services and serializers, minus the database."""
+        return max(self.total - self.auth - self.db - self.render, 0.0)
+
+    def server_timing(self):
+        entries = [f"{phase};dur={getattr(self, phase) * 1000:.1f}" for phase in PHASES]
+        entries[1] += f';desc="{self.queries} queries"'
+        entries.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """In-process request metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._series = defaultdict(lambda: {
+            "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0,
+            "queries": 0, "bytes": 0, **{phase: 0.0 for phase in PHASES},
+        })
+
+    def observe(self, endpoint, business_id, status, timings, size):
+        key = (endpoint, "" if business_id is None else business_id)
+        with self._lock:
+            self._requests[key + (status,)] += 1
+            series = self._series[key]
+            series["count"] += 1
+            series["sum"] += timings.total
+            for index, bound in enumerate(self.buckets):
+                if timings.total <= bound:
+                    series["buckets"][index] += 1
+            series["queries"] += timings.queries
+            series["bytes"] += size or 0
+            for phase in PHASES:
+                series[phase] += getattr(timings, phase)
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            requests = dict(self._requests)
+            series = {key: {**value, "buckets": list(value["buckets"])} for key, value in self._series.items()}
+
+        lines = ["# TYPE catalog_requests_total counter"]
+        for (endpoint, business, status), count in sorted(requests.items(), key=str):
+            lines.append(f"catalog_requests_total{_labels(endpoint=endpoint, business=business, status=status)} {count}")
+
+        lines.append("# TYPE catalog_request_duration_seconds histogram")
+        for (endpoint, business), value in sorted(series.items(), key=str):
+            for bound, count in zip(self.buckets, value["buckets"]):
+                labels = _labels(endpoint=endpoint, business=business, le=bound)
+                lines.append(f"catalog_request_duration_seconds_bucket{labels} {count}")
+            labels = _labels(endpoint=endpoint, business=business, le="+Inf")
+            lines.append(f"catalog_request_duration_seconds_bucket{labels} {value['count']}")
+            labels = _labels(endpoint=endpoint, business=business)
+            lines.append(f"catalog_request_duration_seconds_sum{labels} {value['sum']:.6f}")
+            lines.append(f"catalog_request_duration_seconds_count{labels} {value['count']}")
+
+        lines.append("# TYPE catalog_request_phase_seconds_total counter")
+        for (endpoint, business), value in sorted(series.items(), key=str):
+            for phase in PHASES:
+                labels = _labels(endpoint=endpoint, business=business, phase=phase)
+                lines.append(f"catalog_request_phase_seconds_total{labels} {value[phase]:.6f}")
+
+        for name, field in (("catalog_request_queries_total", "queries"), ("catalog_response_bytes_total", "bytes")):
+            lines.append(f"# TYPE {name} counter")
+            for (endpoint, business), value in sorted(series.items(), key=str):
+                lines.append(f"{name}{_labels(endpoint=endpoint, business=business)} {value[field]}")
+
+        lines.append("# TYPE catalog_cache_events_total counter")
+        for event, count in sorted(get_cache_stats().items()):
+            lines.append(f"catalog_cache_events_total{_labels(event=event)} {count}")
+
+        jwt = verification_stats.snapshot()
+        lines += [
+            "# TYPE catalog_jwt_verifications_total counter",
+            f"catalog_jwt_verifications_total {jwt['verifications']}",
+            "# TYPE catalog_jwt_cache_hits_total counter",
+            f"catalog_jwt_cache_hits_total {jwt['cache_hits']}",
+            "# TYPE catalog_jwt_verifications_per_second gauge",
+            f"catalog_jwt_verifications_per_second {jwt['verifications_per_second']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _log_slow_request(request, endpoint, business_id, timings):
+    threshold = getattr(settings, "CATALOG_SLOW_REQUEST_MS", SLOW_REQUEST_MS)
+    if threshold is None or timings.total * 1000 < threshold:
+        return
+    statements = sorted(timings.statements, key=lambda statement: statement[0], reverse=True)
+    logger.warning(
+        "Slow request %s %s (%s, business %s): %.1f ms, %s queries in %.1f ms\n%s",
+        request.method, request.get_full_path(), endpoint, business_id, timings.total * 1000,
+        timings.queries, timings.db * 1000,
+        "\n".join(f"  {duration * 1000:.1f} ms  {sql}" for duration, sql in statements),
+        extra={"endpoint": endpoint, "business_id": business_id, "server_timing": timings.server_timing()},
+    )
+
+
+class InstrumentedViewMixin:
+    """
+    Record, per endpoint and business, the time a DRF view spends authenticating, in the
+    database, in its handler and rendering, plus its query count and response size.
+    Results go to the Server-Timing header, the metrics registry and, past
+    CATALOG_SLOW_REQUEST_MS, the catalog.slow_requests log with the request's SQL.
+    Streamed bodies run after the view returns, so only their setup is measured.
+    """
+
+    def perform_authentication(self, request):
+        start = time.perf_counter()
+        try:
+            super().perform_authentication(request)
+        finally:
+            self.timings.auth += time.perf_counter() - start
+
+    def dispatch(self, request, *args, **kwargs):
+        self.timings = timings = RequestTimings()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = super().dispatch(request, *args, **kwargs)
+            if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+                start = time.perf_counter()
+                response.render()
+                timings.render = time.perf_counter() - start
+        timings.total = time.perf_counter() - timings.started
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.url_name if match and match.url_name else type(self).__name__
+        business_id = getattr(getattr(self.request, "user", None), "business_id", None)
+        size = None if response.streaming else len(response.content)
+        registry.observe(endpoint, business_id, response.status_code, timings, size)
+        if getattr(settings, "CATALOG_SERVER_TIMING", True):
+            response["Server-Timing"] = timings.server_timing()
+        _log_slow_request(request, endpoint, business_id, timings)
+        return response
@@ -0,0 +1,89 @@
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import jwt
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from helpers.jwt_key_service import PublicKeyCache
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent product list reads through the sync DRF view and the async view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business-id", type=int, default=1)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--cached", action="store_true", help="Keep the read-through cache on; by default every request reads the database.")
+
+    def handle(self, *args, **options):
+        # Sign with a throwaway key that PublicKeyCache hands back for the duration of the run.
+        secret = uuid.uuid4().hex
+        token = jwt.encode(
+            {"usertype": "business", "id": 1, "user_id": 1, "name": "benchmark", "business_id": options["business_id"]},
+            secret,
+            algorithm="HS256",
+        )
+        # AsyncClient only sends headers given as headers=, not as HTTP_* extras.
+        headers = {"Authorization": f"Bearer {token}"}
+        params = {"page_size": options["page_size"]}
+
+        cache_settings = {} if options["cached"] else {"CATALOG_CACHE_TIMEOUT": 0}
+        with override_settings(**cache_settings), \
+                mock.patch.object(PublicKeyCache, "get_public_key", return_value={"key": secret, "algorithm": "HS256"}):
+            sync_url = reverse("product-list-create")
+            async_url = reverse("async-product-list-create")
+            results = {
+                "sync": self.run_sync(sync_url, params, headers, options["requests"], options["concurrency"]),
+                "async": asyncio.run(self.run_async(async_url, params, headers, options["requests"], options["concurrency"])),
+            }
+
+        for name, (elapsed, latencies) in results.items():
+            latencies.sort()
+            self.stdout.write(
+                f"{name:>5}: {len(latencies) / elapsed:8.1f} req/s  "
+                f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f} ms"
+            )
+
+    def run_sync(self, url, params, headers, total, concurrency):
+        def request(_):
+            started = time.perf_counter()
+            response = Client().get(url, params, headers=headers)
+            elapsed = time.perf_counter() - started
+            self.check_response(url, response)
+            return elapsed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(request, range(total)))
+        return time.perf_counter() - started, latencies
+
+    async def run_async(self, url, params, headers, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, params, headers=headers)
+                elapsed = time.perf_counter() - started
+                self.check_response(url, response)
+                return elapsed
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(request() for _ in range(total)))
+        return time.perf_counter() - started, list(latencies)
+
+    @staticmethod
+    def check_response(url, response):
+        # An error page is fast to render, so timing it would flatter the view.
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} answered {response.status_code}: {response.content[:200]!r}")
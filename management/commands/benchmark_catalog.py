@@ -0,0 +1,269 @@
+import itertools
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+import django
+import jwt
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.services.business import CategoryService, ProductService
+from helpers.jwt_key_service import PublicKeyCache
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * percent / 100) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic businesses into a throwaway SQLite database and measure latency "
+        "percentiles, query counts and peak memory of the catalog endpoints, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--businesses", type=int, default=3)
+        parser.add_argument("--categories", type=int, default=20, help="Categories per business.")
+        parser.add_argument("--products", type=int, default=50, help="Products per category.")
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario.")
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--algorithm", choices=["RS256", "HS256"], default="RS256")
+        parser.add_argument("--cached", action="store_true", help="Keep the read-through cache on; by default every request reads the database.")
+        parser.add_argument("--output", help="Write the results to this file instead of stdout.")
+        parser.add_argument("--baseline", help="Results of an earlier run; fail if this run regressed against it.")
+        parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed p95 latency growth over the baseline, in percent.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark seeds an SQLite test database; run it with SQLite DATABASES settings.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = self.compare(baseline, results, options["max_regression"])
+            if regressions:
+                raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+            self.stderr.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        businesses = list(range(1, options["businesses"] + 1))
+        seeded = {business_id: self.seed(business_id, options, rng) for business_id in businesses}
+
+        key, verify_key = self.signing_keys(options["algorithm"])
+        headers = {
+            business_id: {"HTTP_AUTHORIZATION": "Bearer " + jwt.encode(
+                {"usertype": "business", "id": business_id, "user_id": business_id, "name": "benchmark", "business_id": business_id},
+                key,
+                algorithm=options["algorithm"],
+            )}
+            for business_id in businesses
+        }
+
+        cache_settings = {} if options["cached"] else {"CATALOG_CACHE_TIMEOUT": 0}
+        with override_settings(**cache_settings), \
+                mock.patch.object(PublicKeyCache, "get_public_key", return_value={"key": verify_key, "algorithm": options["algorithm"]}):
+            scenarios = {
+                name: self.measure(name, requests, options["requests"])
+                for name, requests in self.scenarios(seeded, headers, options, rng)
+            }
+
+        return {
+            "config": {
+                name: options[name]
+                for name in ("businesses", "categories", "products", "requests", "page_size", "seed", "algorithm", "cached")
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "machine": platform.machine(),
+            },
+            "scenarios": scenarios,
+        }
+
+    def seed(self, business_id, options, rng):
+        categories = CategoryService.bulk_create(
+            [
+                {"name": f"Business {business_id} category {index}", "slug": f"b{business_id}-category-{index}"}
+                for index in range(options["categories"])
+            ],
+            business_id,
+        )
+        products = ProductService.bulk_create(
+            [
+                {
+                    "category": category,
+                    "name": f"Product {category.pk}-{index}",
+                    "description": f"Synthetic product {index} of {category.name}",
+                    "price": Decimal(rng.randrange(100, 100000)) / 100,
+                }
+                for category in categories
+                for index in range(options["products"])
+            ],
+            business_id,
+        )
+        return categories, products
+
+    @staticmethod
+    def signing_keys(algorithm):
+        """A throwaway signing key and the key PublicKeyCache hands out to verify with."""
+        if algorithm == "HS256":
+            secret = uuid.uuid4().hex
+            return secret, secret
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        return private_key, public_pem.decode()
+
+    def scenarios(self, seeded, headers, options, rng):
+        """
+        Yield (name, requests) pairs; each request is a zero-argument callable. Scenarios
+        run in order, so create comes before the update and delete scenarios that use its rows.
+        """
+        client = Client()
+        total = options["requests"] + 1  # One more request for the memory pass.
+        businesses = itertools.cycle(seeded)
+        params = {"page_size": options["page_size"]}
+        counter = itertools.count()
+
+        def plan(build):
+            return [build(next(businesses)) for _ in range(total)]
+
+        def category_payload():
+            number = next(counter)
+            return {"name": f"Benchmark category {number}", "slug": f"benchmark-category-{number}"}
+
+        def product_payload(business_id):
+            category = rng.choice(seeded[business_id][0])
+            return {"category": category.pk, "name": f"Benchmark product {next(counter)}", "price": "9.99"}
+
+        def create(rows, business_id, url, payload):
+            response = client.post(url, payload, content_type="application/json", **headers[business_id])
+            if response.status_code == 201:
+                rows.append((business_id, response.json()))
+            return response
+
+        yield "category_list", plan(lambda b: lambda: client.get(reverse("category-list-create"), params, **headers[b]))
+        yield "product_list", plan(lambda b: lambda: client.get(reverse("product-list-create"), params, **headers[b]))
+        yield "category_detail", plan(lambda b: (
+            lambda category=rng.choice(seeded[b][0]):
+                client.get(reverse("category-detail", args=[category.category_id]), **headers[b])
+        ))
+        yield "product_detail", plan(lambda b: (
+            lambda product=rng.choice(seeded[b][1]):
+                client.get(reverse("product-detail", args=[product.product_id]), **headers[b])
+        ))
+
+        new_categories, new_products = [], []
+        yield "category_create", plan(lambda b: (
+            lambda payload=category_payload(): create(new_categories, b, reverse("category-list-create"), payload)
+        ))
+        yield "product_create", plan(lambda b: (
+            lambda payload=product_payload(b): create(new_products, b, reverse("product-list-create"), payload)
+        ))
+
+        yield "category_update", [
+            lambda b=b, category=category: client.put(
+                reverse("category-detail", args=[category["category_id"]]),
+                {"description": "Updated by the benchmark"}, content_type="application/json", **headers[b],
+            )
+            for b, category in new_categories
+        ]
+        yield "product_update", [
+            lambda b=b, product=product: client.patch(
+                reverse("product-detail", args=[product["product_id"]]),
+                {"price": "19.99"}, content_type="application/json", **headers[b],
+            )
+            for b, product in new_products
+        ]
+        yield "product_delete", [
+            lambda b=b, product=product: client.delete(reverse("product-detail", args=[product["product_id"]]), **headers[b])
+            for b, product in new_products
+        ]
+        yield "category_delete", [
+            lambda b=b, category=category: client.delete(reverse("category-detail", args=[category["category_id"]]), **headers[b])
+            for b, category in new_categories
+        ]
+
+    def measure(self, name, requests, count):
+        """Time `count` requests, then run the last one under tracemalloc for the peak memory."""
+        latencies, queries = [], []
+        for request in requests[:count]:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: request failed with {response.status_code}: {response.content[:200]!r}")
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            for request in requests[count:]:
+                request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        result = {
+            "requests": len(latencies),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+            **{f"p{percent}_ms": round(_percentile(latencies, percent) * 1000, 3) for percent in PERCENTILES},
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "queries_max": max(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+        self.stderr.write(f"{name:>16}: {result['p50_ms']:9.2f} ms p50 {result['p95_ms']:9.2f} ms p95 {result['queries_max']:3} queries")
+        return result
+
+    @staticmethod
+    def compare(baseline, results, max_regression):
+        """A p95 beyond max_regression percent of the baseline or any extra query is a regression."""
+        regressions = []
+        for name, result in results["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if before is None:
+                continue
+            limit = before["p95_ms"] * (1 + max_regression / 100)
+            if result["p95_ms"] > limit:
+                regressions.append(f"{name}: p95 {result['p95_ms']} ms > {limit:.3f} ms (baseline {before['p95_ms']} ms)")
+            if result["queries_max"] > before["queries_max"]:
+                regressions.append(f"{name}: {result['queries_max']} queries > baseline {before['queries_max']}")
+        return regressions
@@ -0,0 +1,82 @@
+import gzip
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from catalog import models
+from catalog.compression import brotli
+from catalog.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from catalog.serializers import business as business_serializers
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing and rendering a product list through ProductSerializer and "
+        "DRF's JSONRenderer against the values path with the orjson and MessagePack renderers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Products per rendered list.")
+        parser.add_argument("--repeat", type=int, default=20, help="Renders per variant; the best run is reported.")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        category = models.Category(id=1, category_id=1000, business_id=1, name="Benchmark", slug="benchmark")
+        now = timezone.now()
+        products = [
+            models.Product(
+                id=index, product_id=100000 + index, business_id=1, category=category,
+                name=f"Product {index}", description=f"Synthetic product number {index}",
+                price=Decimal(index % 10000) / 100 + Decimal("0.99"), is_active=True,
+                created_at=now, updated_at=now,
+            )
+            for index in range(rows)
+        ]
+        # What ProductService.get_values() returns for the same products.
+        values = [
+            {
+                "id": product.id, "product_id": product.product_id, "business_id": product.business_id,
+                "category": category.id, "category_name": category.name, "name": product.name,
+                "description": product.description, "price": product.price, "image_url": None,
+                "is_active": True, "created_at": now, "updated_at": now,
+            }
+            for product in products
+        ]
+
+        def serializer_data():
+            return business_serializers.ProductSerializer(products, many=True).data
+
+        def values_data():
+            return business_serializers.ProductValuesSerializer(values).data
+
+        variants = {"ProductSerializer + JSONRenderer": (serializer_data, JSONRenderer())}
+        variants["values + JSONRenderer"] = (values_data, JSONRenderer())
+        if orjson is not None:
+            variants["values + ORJSONRenderer"] = (values_data, ORJSONRenderer())
+        if msgpack is not None:
+            variants["values + MessagePackRenderer"] = (values_data, MessagePackRenderer())
+
+        results = {}
+        for name, (build, renderer) in variants.items():
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                body = renderer.render(build())
+                best = min(best, time.perf_counter() - started)
+            results[name] = {
+                "ms": round(best * 1000, 3),
+                "rows_per_second": round(rows / best),
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+            }
+            if brotli is not None:
+                results[name]["brotli_bytes"] = len(brotli.compress(body, quality=5))
+
+        baseline = results["ProductSerializer + JSONRenderer"]["ms"]
+        for result in results.values():
+            result["speedup"] = round(baseline / result["ms"], 2)
+        self.stdout.write(json.dumps({"rows": rows, "results": results}, indent=2))
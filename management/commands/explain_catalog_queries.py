@@ -0,0 +1,72 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from catalog import models, sharding
+from catalog.pagination import get_page_size
+from catalog.services.business import CategoryService, ProductService
+
+# Plan lines that mean a full table scan, per backend.
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (catalog_\w+)"),
+    "sqlite": re.compile(r"\bSCAN (catalog_\w+)\b(?! USING)"),
+}
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the catalog service queries and report sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business-id", type=int, default=1, help="Business to build the queries for.")
+        parser.add_argument("--analyze", action="store_true", help="Use EXPLAIN ANALYZE (PostgreSQL only).")
+        parser.add_argument("--strict", action="store_true", help="Exit with an error if any sequential scan is found.")
+
+    def get_queries(self, business_id):
+        page_size = get_page_size(None) + 1
+        db = sharding.db_for_read(business_id)
+        category = models.Category.objects.using(db).filter(business_id=business_id).first()
+        product = models.Product.objects.using(db).filter(business_id=business_id).first()
+        return {
+            "CategoryService.get_page": CategoryService.get_all(business_id, using=db).order_by("-created_at", "-id")[:page_size],
+            "ProductService.get_page": ProductService.get_all(business_id, using=db).order_by("-created_at", "-id")[:page_size],
+            "ProductService.get_values_page": ProductService.get_values(business_id, using=db).order_by("-created_at", "-id")[:page_size],
+            "CategoryService.get_by_id": models.Category.objects.using(db).filter(
+                category_id=category.category_id if category else 0, business_id=business_id
+            ),
+            "ProductService.get_by_id": models.Product.objects.using(db).select_related("category").filter(
+                product_id=product.product_id if product else 0, business_id=business_id
+            ),
+        }
+
+    def handle(self, *args, **options):
+        # The queries run on the business's shard, so its backend decides the EXPLAIN syntax.
+        connection = connections[sharding.db_for_read(options["business_id"])]
+        options_kwargs = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                raise CommandError("--analyze is only supported on PostgreSQL.")
+            options_kwargs["analyze"] = True
+
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        seq_scans = []
+        for name, queryset in self.get_queries(options["business_id"]).items():
+            plan = queryset.explain(**options_kwargs)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            self.stdout.write("")
+            if pattern:
+                tables = set(pattern.findall(plan))
+                seq_scans += [(name, table) for table in sorted(tables)]
+
+        if pattern is None:
+            self.stdout.write(self.style.WARNING(f"Sequential scan detection is not available for {connection.vendor}."))
+            return
+        if not seq_scans:
+            self.stdout.write(self.style.SUCCESS("No sequential scans found."))
+            return
+
+        for name, table in seq_scans:
+            self.stdout.write(self.style.WARNING(f"{name}: sequential scan on {table}"))
+        if options["strict"]:
+            raise CommandError(f"{len(seq_scans)} sequential scan(s) found.")
@@ -0,0 +1,152 @@
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from catalog import models, sharding
+from catalog.serializers.business import CategorySerializer, ProductSerializer
+from catalog.services.business import CategoryService, ProductService
+from catalog.streaming import InvalidRecord, read_records
+
+IMPORT_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV or NDJSON file of categories and products into one business. "
+        "Every record has a `type` of category or product; products name their category "
+        "with `category_slug`. Categories whose slug already exists for the business are reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import.")
+        parser.add_argument("--business-id", type=int, required=True)
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Records per transaction.")
+        parser.add_argument("--checkpoint", help="Name the progress is recorded under. Defaults to the absolute path.")
+        parser.add_argument("--resume", action="store_true", help="Skip the records committed by a previous run.")
+        parser.add_argument("--strict", action="store_true", help="Abort on the first invalid record instead of skipping it.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        self.business_id = options["business_id"]
+        self.strict = options["strict"]
+        db = sharding.db_for_write(self.business_id)
+        # Progress is a row on the business's shard, committed with the records it counts.
+        checkpoint = {"business_id": self.business_id, "name": options["checkpoint"] or os.path.abspath(path)}
+        checkpoints = models.ImportCheckpoint.objects.using(db)
+
+        done = self.read_checkpoint(checkpoints.filter(**checkpoint)) if options["resume"] else 0
+        # One in-memory slug -> category map serves every product row of the file.
+        self.categories = {
+            category.slug: category
+            for category in models.Category.objects.using(db).filter(business_id=self.business_id, deleted_at__isnull=True).only("id", "slug")
+        }
+        self.category_validator = CategorySerializer(many=True, context={"business_id": self.business_id}).child
+        self.product_validator = ProductSerializer(many=True, context={"categories": {}}).child
+
+        created = {"category": 0, "product": 0}
+        skipped = 0
+        with open(path, newline="", encoding="utf-8") as stream:
+            records = enumerate(read_records(stream, input_format), start=1)
+            for _ in islice(records, done):
+                pass
+            while True:
+                chunk = list(islice(records, options["chunk_size"]))
+                if not chunk:
+                    break
+                category_rows, product_rows, invalid = self.split_chunk(chunk)
+                # Reserved before the transaction, so the IdSequence rows are not locked
+                # while the chunk is validated and written; rejected rows leave gaps.
+                reserved = (CategoryService.reserve_ids(len(category_rows)), ProductService.reserve_ids(len(product_rows)))
+                done = chunk[-1][0]
+                with transaction.atomic(using=db):
+                    counts, rejected = self.import_chunk(category_rows, product_rows, *reserved)
+                    checkpoints.update_or_create(**checkpoint, defaults={"done": done})
+                invalid += rejected
+                created["category"] += counts["category"]
+                created["product"] += counts["product"]
+                skipped += invalid
+                self.stdout.write(f"Committed records up to {done}.")
+
+        checkpoints.filter(**checkpoint).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created['category']} categories and {created['product']} products, skipped {skipped} invalid records."
+        ))
+
+    def split_chunk(self, chunk):
+        """Sort the records of a chunk into (new category rows, product rows, invalid record count)."""
+        category_rows, product_rows, invalid = [], [], 0
+        pending_slugs = set()
+        for number, record in chunk:
+            if isinstance(record, InvalidRecord):
+                invalid += self.reject(number, {"non_field_errors": [str(record)]})
+                continue
+            record = {key: value for key, value in record.items() if value not in ("", None)}
+            record_type = record.pop("type", None)
+            if record_type == "category":
+                slug = record.get("slug")
+                if slug not in self.categories and slug not in pending_slugs:
+                    pending_slugs.add(slug)
+                    category_rows.append((number, record))
+            elif record_type == "product":
+                product_rows.append((number, record))
+            else:
+                invalid += self.reject(number, {"type": ["Must be category or product."]})
+        return category_rows, product_rows, invalid
+
+    def import_chunk(self, category_rows, product_rows, category_ids, product_ids):
+        """
+        Validate and write one chunk with IDs reserved for it. Returns ({type: created
+        count}, invalid record count).
+        """
+        invalid = 0
+        # Categories first, so products of the same chunk can point at them.
+        valid, pending_names = [], set()
+        for number, record in category_rows:
+            try:
+                data = self.category_validator.run_validation(record)
+            except ValidationError as exc:
+                invalid += self.reject(number, exc.detail)
+                continue
+            # Names are unique too, and the validator only sees the rows already written.
+            if data["name"] in pending_names:
+                invalid += self.reject(number, {"name": ["category with this name already exists."]})
+                continue
+            pending_names.add(data["name"])
+            valid.append(data)
+        categories = CategoryService.bulk_create(valid, self.business_id, reserved=category_ids) if valid else []
+        self.categories.update((category.slug, category) for category in categories)
+
+        self.product_validator.context["categories"] = {category.pk: category for category in self.categories.values()}
+        valid = []
+        for number, record in product_rows:
+            category = self.categories.get(record.pop("category_slug", None))
+            if category is None:
+                invalid += self.reject(number, {"category_slug": ["Unknown category slug."]})
+                continue
+            record["category"] = category.pk
+            try:
+                valid.append(self.product_validator.run_validation(record))
+            except ValidationError as exc:
+                invalid += self.reject(number, exc.detail)
+        products = ProductService.bulk_create(valid, self.business_id, reserved=product_ids) if valid else []
+
+        return {"category": len(categories), "product": len(products)}, invalid
+
+    def reject(self, number, errors):
+        if self.strict:
+            raise CommandError(f"Record {number}: {errors}")
+        self.stderr.write(f"Record {number} skipped: {errors}")
+        return 1
+
+    def read_checkpoint(self, checkpoints):
+        done = checkpoints.values_list("done", flat=True).first()
+        if done is None:
+            self.stdout.write("No checkpoint to resume from; starting at the first record.")
+            return 0
+        self.stdout.write(f"Resuming after record {done}.")
+        return done
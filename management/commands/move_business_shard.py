@@ -0,0 +1,119 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from catalog import models, sharding
+from catalog.cache import invalidate
+from catalog.services import search
+
+MOVE_BATCH_SIZE = 1000
+TIMESTAMPS = ["created_at", "updated_at"]
+COPIED_MODELS = [models.Category, models.Product, models.Tombstone]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the catalog of one business to another shard. Its writes are refused with a 503 "
+        "while it moves; reads keep being served. Rows keep their pks, which the API, ETags and "
+        "change feed cursors expose; they are allocated from the directory, so they are unique "
+        "across shards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business-id", type=int, required=True)
+        parser.add_argument("--to", required=True, help="Database alias from CATALOG_SHARDS.")
+        parser.add_argument("--batch-size", type=int, default=MOVE_BATCH_SIZE, help="Rows copied or deleted per query.")
+
+    def handle(self, *args, **options):
+        self.business_id = business_id = options["business_id"]
+        self.batch_size = options["batch_size"]
+        target = options["to"]
+        if target not in sharding.shards():
+            raise CommandError(f"{target!r} is not one of CATALOG_SHARDS.")
+        sharding.forget(business_id)
+        source = sharding.db_for_read(business_id)
+        if source == target:
+            raise CommandError(f"Business {business_id} is already on {target}.")
+
+        # Stop writes, then wait until no process still routes them by an older directory entry.
+        sharding.assign(business_id, source, moving=True)
+        self.wait("writes to stop")
+        try:
+            with transaction.atomic(using=target):
+                self.delete_rows(target)
+                counts = self.copy(source, target)
+        except BaseException:
+            sharding.assign(business_id, source)
+            raise
+        sharding.assign(business_id, target)
+        invalidate(business_id)
+        search.reset_indexes()
+        self.stdout.write(f"Copied {counts['category']} categories, {counts['product']} products and "
+                          f"{counts['tombstone']} tombstones to {target}.")
+
+        # Processes that still place the business on the source read from it until they refresh.
+        self.wait("reads of the source to stop")
+        invalidate(business_id)
+        deleted = self.delete_rows(source)
+        self.stdout.write(self.style.SUCCESS(f"Moved business {business_id} from {source} to {target}; "
+                                             f"removed {deleted} rows from {source}."))
+
+    def wait(self, reason):
+        ttl = getattr(settings, "CATALOG_SHARD_DIRECTORY_TTL", sharding.DIRECTORY_TTL)
+        if ttl:
+            self.stdout.write(f"Waiting {ttl}s for {reason}.")
+            time.sleep(ttl)
+
+    def batches(self, queryset):
+        rows = queryset.order_by("pk").iterator(chunk_size=self.batch_size)
+        while batch := list(islice(rows, self.batch_size)):
+            yield batch
+
+    def insert(self, model, rows, target):
+        """Insert rows read from another database on `target` under the same pks."""
+        taken = list(model.objects.using(target).filter(pk__in=[row.pk for row in rows]).values_list("id", flat=True)[:5])
+        if taken:
+            # Only rows created before pks came from the directory can collide.
+            raise CommandError(f"{model.__name__} pks {taken} are already used on {target}.")
+        fields = [field.name for field in model._meta.concrete_fields if field.name in TIMESTAMPS]
+        stamps = {row.pk: [getattr(row, name) for name in fields] for row in rows}
+        model.objects.using(target).bulk_create(rows)
+        if fields:
+            for row in rows:
+                for name, value in zip(fields, stamps[row.pk]):
+                    setattr(row, name, value)
+            # bulk_create() stamps auto_now columns with the current time; bulk_update() does not.
+            model.objects.using(target).bulk_update(rows, fields)
+
+    def copy(self, source, target):
+        counts = {}
+        for model in COPIED_MODELS:
+            counts[model._meta.model_name] = 0
+            for rows in self.batches(model.objects.using(source).filter(business_id=self.business_id)):
+                self.insert(model, rows, target)
+                counts[model._meta.model_name] += len(rows)
+        # Import checkpoints are not exposed anywhere, so they are numbered by the target.
+        for rows in self.batches(models.ImportCheckpoint.objects.using(source).filter(business_id=self.business_id)):
+            for row in rows:
+                row.pk = None
+            models.ImportCheckpoint.objects.using(target).bulk_create(rows)
+        # The target builds a fresh snapshot on first read.
+        return counts
+
+    def delete_rows(self, db):
+        """Delete every row of the business on `db` in batches. Returns how many went."""
+        deleted = 0
+        # Products before categories, so no cascade has to collect them.
+        for model in (
+            models.Product, models.Tombstone, models.Category, models.CatalogSnapshot, models.StaleSnapshotSection,
+            models.ImportCheckpoint,
+        ):
+            queryset = model.objects.using(db).filter(business_id=self.business_id)
+            while pks := list(queryset.values_list("id", flat=True)[:self.batch_size]):
+                with transaction.atomic(using=db):
+                    count, _ = model.objects.using(db).filter(id__in=pks).delete()
+                deleted += count
+        return deleted
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.services.business import PURGE_BATCH_SIZE, CategoryService
+from catalog.services.changes import ChangeFeedService
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete the rows of deleted categories and their products in bounded batches, "
+        "then drop change-feed tombstones past CATALOG_TOMBSTONE_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        batches = purged = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            deleted = CategoryService.purge_deleted(options["batch_size"])
+            if not deleted:
+                break
+            batches += 1
+            purged += deleted
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} rows in {batches} batches."))
+        tombstones = ChangeFeedService.purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Dropped {tombstones} expired tombstones."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from catalog import models, sharding
+from catalog.services.stats import recompute
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-category product counters from the product rows with one set-based UPDATE."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business-id", type=int, help="Only reconcile this business.")
+
+    def handle(self, *args, **options):
+        business_id = options["business_id"]
+        updated = 0
+        if business_id is not None:
+            db = sharding.db_for_read(business_id)
+            updated = recompute(models.Category.objects.using(db).filter(business_id=business_id))
+        else:
+            for db in sharding.shards():
+                updated += recompute(models.Category.objects.using(db))
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} categories."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_product'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['business_id', '-created_at', '-id'], name='catalog_cat_biz_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['business_id', '-created_at', '-id'], name='catalog_prod_biz_created_idx'),
+        ),
+    ]
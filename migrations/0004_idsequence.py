@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:03
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+SEQUENCES = [
+    # name, model, field, first ID, last ID
+    ('category', 'Category', 'category_id', 1000, 9999),
+    ('product', 'Product', 'product_id', 100000, 999999),
+]
+
+
+def create_sequences(apps, schema_editor):
+    db = schema_editor.connection.alias
+    IdSequence = apps.get_model('catalog', 'IdSequence')
+    for name, model_name, field, first, last in SEQUENCES:
+        model = apps.get_model('catalog', model_name)
+        legacy_max = model.objects.using(db).aggregate(value=Max(field))['value'] or 0
+        IdSequence.objects.using(db).create(name=name, next_value=first, max_value=last, legacy_max=legacy_max)
+
+
+def delete_sequences(apps, schema_editor):
+    apps.get_model('catalog', 'IdSequence').objects.using(schema_editor.connection.alias).filter(name__in=[row[0] for row in SEQUENCES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_business_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.PositiveIntegerField()),
+                ('max_value', models.PositiveIntegerField()),
+                ('legacy_max', models.PositiveIntegerField(default=0, help_text='Highest ID handed out randomly before the sequence existed')),
+            ],
+        ),
+        migrations.RunPython(create_sequences, delete_sequences),
+    ]
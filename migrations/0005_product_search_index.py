@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:20
+
+from django.db import migrations
+
+INDEX_NAME = 'catalog_prod_search_idx'
+
+
+def search_index(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    # Must stay the expression of catalog.services.search.product_search_vector() at this migration.
+    return GinIndex(SearchVector('name', 'description', config='simple'), name=INDEX_NAME)
+
+
+def create_search_index(apps, schema_editor):
+    # Only PostgreSQL has full-text search; other databases use the in-process index.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('catalog', 'Product'), search_index(apps))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('catalog', 'Product'), search_index(apps))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_idsequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index, hints={'model_name': 'product'}),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set on delete; purge_deleted_categories removes the rows later', null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def recompute_stats(apps, schema_editor):
+    # The counters as catalog.services.stats.recompute() computed them at this migration.
+    Category = apps.get_model('catalog', 'Category')
+    Product = apps.get_model('catalog', 'Product')
+
+    def active_products(aggregate):
+        return models.Subquery(
+            Product.objects.filter(category=models.OuterRef('pk'), is_active=True)
+            .values('category')
+            .annotate(value=aggregate)
+            .values('value')
+        )
+
+    Category.objects.using(schema_editor.connection.alias).update(
+        product_count=Coalesce(active_products(models.Count('id')), 0),
+        price_sum=Coalesce(active_products(models.Sum('price')), models.Value(Decimal('0'))),
+        min_price=active_products(models.Min('price')),
+        max_price=active_products(models.Max('price')),
+        stats_updated_at=Now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_category_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='price_sum',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='stats_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(recompute_stats, migrations.RunPython.noop, hints={'model_name': 'category'}),
+    ]
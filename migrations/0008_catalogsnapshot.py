@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_category_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_id', models.IntegerField(help_text='Business ID from authentication server', unique=True)),
+                ('sections', models.JSONField(default=dict, help_text='Serialized category with its products, by category pk')),
+                ('data', models.BinaryField(default=b'')),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
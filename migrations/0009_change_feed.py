@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_catalogsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_id', models.IntegerField(blank=True, help_text='Business ID from authentication server', null=True)),
+                ('kind', models.CharField(choices=[('category', 'Category'), ('product', 'Product')], max_length=20)),
+                ('object_id', models.PositiveIntegerField(help_text='Public category_id or product_id of the deleted row')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['business_id', 'deleted_at', 'id'], name='catalog_tomb_biz_deleted_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['business_id', 'updated_at', 'id'], name='catalog_cat_biz_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['business_id', 'updated_at', 'id'], name='catalog_prod_biz_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_id', models.IntegerField(help_text='Business ID from authentication server', unique=True)),
+                ('shard', models.CharField(help_text='Database alias from CATALOG_SHARDS', max_length=100)),
+                ('moving', models.BooleanField(default=False, help_text='Writes are refused while move_business_shard runs')),
+            ],
+        ),
+    ]
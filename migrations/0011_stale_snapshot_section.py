@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_businessshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleSnapshotSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_id', models.IntegerField(help_text='Business ID from authentication server')),
+                ('category_pk', models.PositiveIntegerField(help_text='pk of the category, which may since have been deleted')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['business_id'], name='catalog_stale_section_biz_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:40
+
+from django.db import migrations
+from django.db.models import Max
+
+
+SEQUENCES = [
+    # name, model, last ID
+    ('category_pk', 'Category', 2147483647),
+    ('product_pk', 'Product', 2147483647),
+    ('tombstone_pk', 'Tombstone', 2147483647),
+]
+
+
+def create_sequences(apps, schema_editor):
+    db = schema_editor.connection.alias
+    IdSequence = apps.get_model('catalog', 'IdSequence')
+    tables = schema_editor.connection.introspection.table_names()
+    for name, model_name, last in SEQUENCES:
+        model = apps.get_model('catalog', model_name)
+        # Rows that already exist were numbered by the database; continue after them.
+        highest = model.objects.using(db).aggregate(value=Max('id'))['value'] if model._meta.db_table in tables else None
+        IdSequence.objects.using(db).create(name=name, next_value=(highest or 0) + 1, max_value=last)
+
+
+def delete_sequences(apps, schema_editor):
+    apps.get_model('catalog', 'IdSequence').objects.using(schema_editor.connection.alias).filter(name__in=[row[0] for row in SEQUENCES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_stale_snapshot_section'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequences, delete_sequences),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_pk_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_id', models.IntegerField(help_text='Business ID from authentication server')),
+                ('name', models.CharField(help_text='The --checkpoint name of the import, by default the file path', max_length=500)),
+                ('done', models.PositiveIntegerField(default=0, help_text='Number of leading records committed')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('business_id', 'name'), name='catalog_import_checkpoint_uniq')],
+            },
+        ),
+    ]
@@ -1,5 +1,27 @@
-import random
+from decimal import Decimal
+
 from django.db import models
+from django.utils import timezone
+from catalog.ids import category_ids, category_pks, product_ids, product_pks, tombstone_pks
+
+class IdSequence(models.Model):
+    """Next free public ID for a model, see catalog.ids.IdAllocator."""
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.PositiveIntegerField()
+    max_value = models.PositiveIntegerField()
+    legacy_max = models.PositiveIntegerField(default=0, help_text="Highest ID handed out randomly before the sequence existed")
+
+    def __str__(self):
+        return self.name
+
+class BusinessShard(models.Model):
+    """Directory entry pinning a business to a database, see catalog.sharding."""
+    business_id = models.IntegerField(unique=True, help_text="Business ID from authentication server")
+    shard = models.CharField(max_length=100, help_text="Database alias from CATALOG_SHARDS")
+    moving = models.BooleanField(default=False, help_text="Writes are refused while move_business_shard runs")
+
+    def __str__(self):
+        return f"Business {self.business_id} on {self.shard}"
 
 class Category(models.Model):
     category_id = models.PositiveIntegerField(unique=True, editable=False, blank=True, null=True)
@@ -9,20 +31,44 @@ class Category(models.Model):
     image_url = models.TextField(blank=True, null=True)  # S3 image URL
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, help_text="Set on delete; purge_deleted_categories removes the rows later")
+    # Active product counters, kept current by ProductService (see catalog.services.stats).
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    price_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0, editable=False)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    stats_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # CategoryService.get_all / get_page: active rows of one business, newest first.
+            models.Index(
+                fields=["business_id", "-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="catalog_cat_biz_created_idx",
+            ),
+            # ChangeFeedService: every row of one business changed after a cursor.
+            models.Index(fields=["business_id", "updated_at", "id"], name="catalog_cat_biz_updated_idx"),
+        ]
+
     def save(self, *args, **kwargs):
+        if self.pk is None:
+            self.pk = category_pks.next()
         if not self.category_id:
             self.category_id = self.generate_category_id()
         super().save(*args, **kwargs)
 
+    @property
+    def avg_price(self):
+        if not self.product_count:
+            return None
+        return (self.price_sum / self.product_count).quantize(Decimal("0.01"))
+
     def generate_category_id(self):
-        """Generate a unique 4-digit random category ID."""
-        while True:
-            category_id = random.randint(1000, 9999)
-            if not Category.objects.filter(category_id=category_id).exists():
-                return category_id
+        """Allocate the next free 4-digit category ID."""
+        return category_ids.next()
 
     def __str__(self):
         return self.name
@@ -39,17 +85,94 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # ProductService.get_all / get_values: active rows of one business, newest first.
+            models.Index(
+                fields=["business_id", "-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="catalog_prod_biz_created_idx",
+            ),
+            # ChangeFeedService: every row of one business changed after a cursor.
+            models.Index(fields=["business_id", "updated_at", "id"], name="catalog_prod_biz_updated_idx"),
+        ]
+
     def save(self, *args, **kwargs):
+        if self.pk is None:
+            self.pk = product_pks.next()
         if not self.product_id:
             self.product_id = self.generate_product_id()
         super().save(*args, **kwargs)
 
     def generate_product_id(self):
-        """Generate a unique 6-digit random product ID."""
-        while True:
-            product_id = random.randint(100000, 999999)
-            if not Product.objects.filter(product_id=product_id).exists():
-                return product_id
+        """Allocate the next free 6-digit product ID."""
+        return product_ids.next()
+
+    def __str__(self):
+        return self.name
+
+class Tombstone(models.Model):
+    """A deleted category or product, kept for the change feed (see catalog.services.changes)."""
+    CATEGORY = "category"
+    PRODUCT = "product"
+    KIND_CHOICES = [(CATEGORY, "Category"), (PRODUCT, "Product")]
+
+    business_id = models.IntegerField(null=True, blank=True, help_text="Business ID from authentication server")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField(help_text="Public category_id or product_id of the deleted row")
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["business_id", "deleted_at", "id"], name="catalog_tomb_biz_deleted_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            self.pk = tombstone_pks.next()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
+
+
+class CatalogSnapshot(models.Model):
+    """Pre-serialized, gzipped active catalog of one business, see catalog.services.snapshot."""
+    business_id = models.IntegerField(unique=True, help_text="Business ID from authentication server")
+    sections = models.JSONField(default=dict, help_text="Serialized category with its products, by category pk")
+    data = models.BinaryField(default=b"")
+    etag = models.CharField(max_length=64, blank=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog snapshot of business {self.business_id}"
+
+
+class StaleSnapshotSection(models.Model):
+    """A category whose CatalogSnapshot section changed; the next snapshot read re-serializes it."""
+    business_id = models.IntegerField(help_text="Business ID from authentication server")
+    category_pk = models.PositiveIntegerField(help_text="pk of the category, which may since have been deleted")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["business_id"], name="catalog_stale_section_biz_idx"),
+        ]
+
+    def __str__(self):
+        return f"Stale section {self.category_pk} of business {self.business_id}"
+
+
+class ImportCheckpoint(models.Model):
+    """How far import_catalog got through a file; written in the transaction of each chunk."""
+    business_id = models.IntegerField(help_text="Business ID from authentication server")
+    name = models.CharField(max_length=500, help_text="The --checkpoint name of the import, by default the file path")
+    done = models.PositiveIntegerField(default=0, help_text="Number of leading records committed")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["business_id", "name"], name="catalog_import_checkpoint_uniq"),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"Import {self.name} of business {self.business_id}"
@@ -0,0 +1,96 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _row_key(row):
+    """Return the (created_at, id) keyset position of a model instance or a values() row."""
+    if isinstance(row, dict):
+        return row["created_at"], row["id"]
+    return row.created_at, row.id
+
+
+def encode_cursor(created_at, pk):
+    """Encode a (created_at, id) position as an opaque URL-safe cursor."""
+    payload = json.dumps([created_at.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into (created_at, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if created_at is None:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return created_at, pk
+
+
+def get_page_size(raw):
+    """Validate the ?page_size= query param, falling back to CATALOG_PAGE_SIZE."""
+    default = getattr(settings, "CATALOG_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, "CATALOG_MAX_PAGE_SIZE", MAX_PAGE_SIZE)
+    if raw in (None, ""):
+        return default
+    try:
+        page_size = int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({"page_size": "Must be an integer."})
+    if page_size < 1:
+        raise ValidationError({"page_size": "Must be a positive integer."})
+    return min(page_size, maximum)
+
+
+def parse_fields(raw, serializer_class):
+    """Validate the ?fields= query param against the fields of serializer_class."""
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    allowed = serializer_class().fields.keys()
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+    return fields or None
+
+
+def _keyset(queryset, cursor, page_size):
+    """Order queryset by (-created_at, -id), seek past cursor and slice one row beyond the page."""
+    queryset = queryset.order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset[:page_size + 1]
+
+
+def _page(rows, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(*_row_key(rows[-1]))
+    return rows, next_cursor
+
+
+def paginate(queryset, cursor=None, page_size=None):
+    """
+    Return one keyset page of queryset ordered by (-created_at, -id) and the cursor for the next page.
+    """
+    page_size = page_size or get_page_size(None)
+    return _page(list(_keyset(queryset, cursor, page_size)), page_size)
+
+
+async def apaginate(queryset, cursor=None, page_size=None):
+    """Async paginate(), reading the page with async iteration."""
+    page_size = page_size or get_page_size(None)
+    return _page([row async for row in _keyset(queryset, cursor, page_size)], page_size)
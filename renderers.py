@@ -0,0 +1,73 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+def _default(value):
+    """Encode what the serializers leave as Python objects; called only for those values."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Promise)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON through orjson, which encodes dicts, lists, strings and dates in C."""
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack for clients that send Accept: application/msgpack."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def catalog_renderer_classes():
+    """
+    Renderers of the catalog views: orjson JSON first, so it is what */* gets, then
+    MessagePack when msgpack is installed, then the project's other renderers.
+    """
+    renderers = [ORJSONRenderer if orjson is not None else JSONRenderer]
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    renderers += [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if not issubclass(renderer, JSONRenderer)
+    ]
+    return renderers
+
+
+CATALOG_RENDERER_CLASSES = catalog_renderer_classes()
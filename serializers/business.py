@@ -1,13 +1,78 @@
 from rest_framework import serializers
-from catalog import models
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+from catalog import models, sharding
 
-class CategorySerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Accept a `fields` kwarg that restricts the serializer to a subset of its fields.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Category FK that resolves from context["categories"] ({pk: category}) when the caller
+    preloaded them, so validating many products does not cost one query per row.
+    Otherwise it is looked up among the live categories of context["business_id"], on
+    its shard, when given.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        business_id = self.context.get("business_id")
+        if business_id is None:
+            return queryset
+        return queryset.using(sharding.db_for_read(business_id)).filter(business_id=business_id, deleted_at__isnull=True)
+
+    def to_internal_value(self, data):
+        categories = self.context.get("categories")
+        if categories is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            category = categories.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if category is None:
+            self.fail("does_not_exist", pk_value=data)
+        return category
+
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Category
-        fields = "__all__"
+        # Bookkeeping columns; the counters are served by CategoryStatsSerializer.
+        exclude = [
+            "deleted_at", "product_count", "price_sum", "min_price", "max_price", "stats_updated_at",
+        ]
         read_only_fields = ["business_id","category_id", "created_at", "updated_at"]
 
-class ProductSerializer(serializers.ModelSerializer):
+    def get_fields(self):
+        """Check name and slug uniqueness on the shard of context["business_id"], when given."""
+        fields = super().get_fields()
+        business_id = self.context.get("business_id")
+        if business_id is not None:
+            db = sharding.db_for_read(business_id)
+            for field in fields.values():
+                for validator in field.validators:
+                    if isinstance(validator, UniqueValidator):
+                        validator.queryset = validator.queryset.using(db)
+        return fields
+
+class CategoryStatsSerializer(serializers.ModelSerializer):
+    avg_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = models.Category
+        fields = ["category_id", "name", "product_count", "min_price", "max_price", "avg_price", "stats_updated_at"]
+        read_only_fields = fields
+
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    category = CategoryField(queryset=models.Category.objects.all())
     category_name = serializers.CharField(source='category.name', read_only=True)
     
     class Meta:
@@ -17,4 +82,61 @@ class ProductSerializer(serializers.ModelSerializer):
             "name", "description", "price", "image_url", "is_active",
             "created_at", "updated_at"
         ]
-        read_only_fields = ["business_id", "product_id", "created_at", "updated_at"]
\ No newline at end of file
+        read_only_fields = ["business_id", "product_id", "created_at", "updated_at"]
+
+class ProductSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, default="")
+    category = serializers.IntegerField(required=False)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    is_active = serializers.BooleanField(required=False, default=True)
+    offset = serializers.IntegerField(required=False, min_value=0, default=0)
+    page_size = serializers.IntegerField(required=False, min_value=1)
+
+class ValuesSerializer:
+    """
+    Build serializer_class-shaped dicts straight from .values() rows, without model instances.
+
+    Each value is rendered by the matching serializer_class field, so prices, dates and
+    FK pks come out exactly as they do on the model-based path.
+    """
+    serializer_class = None
+
+    def __init__(self, rows, fields=None):
+        self.rows = rows
+        self.renderers = [
+            (name, self._renderer(field))
+            for name, field in self.serializer_class(fields=fields).fields.items()
+        ]
+
+    @staticmethod
+    def _renderer(field):
+        # .values() already returns the FK as its pk, so relation fields pass it through.
+        if isinstance(field, serializers.RelatedField):
+            return None
+        # The database hands decimals back quantized to the column's places, which is
+        # all DecimalField.to_representation would do before formatting them.
+        if isinstance(field, serializers.DecimalField) and not field.localize:
+            # coerce_to_string is only set on the field when it was passed explicitly.
+            if getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+                return str
+        return field.to_representation
+
+    def to_representation(self, row):
+        data = {}
+        for name, render in self.renderers:
+            value = row[name]
+            data[name] = value if value is None or render is None else render(value)
+        return data
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+
+class CategoryValuesSerializer(ValuesSerializer):
+    serializer_class = CategorySerializer
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
@@ -1,68 +1,536 @@
-from catalog import models
+from catalog import ids, models, sharding
+from catalog.cache import enabled as cache_enabled, invalidate, read_through
+from catalog.pagination import paginate
+from catalog.services import changes, search, snapshot, stats
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+BULK_BATCH_SIZE = 1000
+PURGE_BATCH_SIZE = 1000
+UPDATE_ATTEMPTS = 3
+
+# Serializer fields that are not model columns, mapped to the columns they read from.
+PROJECTION_ALIASES = {"category_name": ("category", "category__name")}
+
+
+def _only_columns(fields):
+    """Translate serializer field names into the columns to load with .only()."""
+    columns = set()
+    for name in fields:
+        columns.update(PROJECTION_ALIASES.get(name, (name,)))
+    # The keyset cursor always needs these, whatever the client asked for.
+    columns.update({"id", "created_at"})
+    return sorted(columns)
+
+
+class UpdateConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The row kept changing while it was being updated; try again."
+    default_code = "update_conflict"
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The row changed since the version given in If-Match."
+    default_code = "precondition_failed"
+
+
+def _changed(instance, data):
+    """The part of `data` that differs from the instance, comparing relations by pk."""
+    changes = {}
+    for key, value in data.items():
+        field = instance._meta.get_field(key)
+        new = value.pk if field.is_relation and value is not None else value
+        if getattr(instance, field.attname) != new:
+            changes[key] = value
+    return changes
+
+
+def _write_changes(instance, changes):
+    """
+    Write only the changed columns with one UPDATE that matches the row as it was read,
+    by pk, business and updated_at, then apply them to the instance. Returns False when
+    a concurrent write got to the row first.
+    """
+    now = timezone.now()
+    matched = type(instance).objects.using(instance._state.db).filter(
+        pk=instance.pk, business_id=instance.business_id, updated_at=instance.updated_at
+    ).update(**changes, updated_at=now)
+    if not matched:
+        return False
+    for key, value in changes.items():
+        setattr(instance, key, value)
+    instance.updated_at = now
+    return True
+
+
+def _live_categories(db):
+    """Categories on database `db` that have not been deleted; deleted ones wait for purge_deleted()."""
+    return models.Category.objects.using(db).filter(deleted_at__isnull=True)
+
+
+def _categories_written(business_id, categories):
+    """
+    Run after a category write; category names show up in product reads and search.
+    `categories` are the pks of the categories whose snapshot section changed. The
+    snapshot is marked stale first, so its on_commit hook runs before the cache moves on.
+    """
+    snapshot.categories_changed(business_id, categories)
+    invalidate(business_id)
+    search.categories_changed(business_id)
+
+
+def _products_written(business_id, pks, categories):
+    """Run after products were created or updated, with the pks of the categories they were and are in."""
+    snapshot.categories_changed(business_id, categories)
+    invalidate(business_id)
+    search.products_changed(business_id, pks)
+
+
+def _products_deleted(business_id, pks, categories):
+    """Run after products were deleted, with the pks of the categories they were in."""
+    snapshot.categories_changed(business_id, categories)
+    invalidate(business_id)
+    search.products_removed(business_id, pks)
+
+
+# Columns read by the .values() fast path, in serializer field order.
+CATEGORY_VALUES_COLUMNS = [
+    "id", "category_id", "business_id", "name", "slug", "image_url",
+    "description", "is_active", "created_at", "updated_at",
+]
+PRODUCT_VALUES_COLUMNS = [
+    "product_id", "business_id", "category", "category_name",
+    "name", "description", "price", "image_url", "is_active",
+    "created_at", "updated_at",
+]
+
+
+def db_for_page_read(business_id):
+    """
+    Where list pages are read: the shard itself while they are cached, since a replica
+    that has not caught up would stay cached, and a replica when caching is off.
+    """
+    if cache_enabled():
+        return sharding.db_for_read(business_id)
+    return sharding.db_for_replica_read(business_id)
+
 
 class CategoryService:
     @staticmethod
-    def get_all(business_id):
-        """Return all categories for a specific business."""
-        return models.Category.objects.filter(business_id=business_id, is_active=True).order_by("-created_at")
+    def get_all(business_id, fields=None, using=None):
+        """
+        Return all categories for a specific business, read from a replica of its shard
+        unless `using` names another database.
+        """
+        using = using or sharding.db_for_replica_read(business_id)
+        queryset = models.Category.objects.using(using).filter(business_id=business_id, is_active=True).order_by("-created_at")
+        if fields:
+            queryset = queryset.only(*_only_columns(fields))
+        return queryset
 
     @staticmethod
+    @read_through("category_page")
+    def get_page(business_id, cursor=None, page_size=None, fields=None):
+        """Return one keyset page of categories and the cursor for the next page."""
+        queryset = CategoryService.get_all(business_id, fields, using=db_for_page_read(business_id))
+        return paginate(queryset, cursor, page_size)
+
+    @staticmethod
+    def get_values(business_id, fields=None, using=None):
+        """Return active categories as .values() rows."""
+        fields = fields or CATEGORY_VALUES_COLUMNS
+        columns = dict.fromkeys([*fields, "id", "created_at"])
+        using = using or sharding.db_for_read(business_id)
+        queryset = models.Category.objects.using(using).filter(business_id=business_id, is_active=True)
+        return queryset.values(*columns).order_by("-created_at")
+
+    @staticmethod
+    @read_through("category_version")
+    def get_version(business_id):
+        """Return the row count and last update of the business's active categories, for HTTP validators."""
+        categories = models.Category.objects.using(sharding.db_for_read(business_id))
+        return categories.filter(business_id=business_id, is_active=True).aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+
+    @staticmethod
+    @read_through("category")
     def get_by_id(category_id, business_id):
-        """Get a category belonging to the same business."""
-        return get_object_or_404(models.Category, category_id=category_id, business_id=business_id)
+        """Get a category belonging to the same business, read from the primary of its shard."""
+        queryset = _live_categories(sharding.db_for_read(business_id))
+        return get_object_or_404(queryset, category_id=category_id, business_id=business_id)
+
+    @staticmethod
+    def get_stats(business_id):
+        """
+        Return the active categories of a business with their maintained product counters,
+        read from a replica of its shard: the result is not cached.
+        """
+        categories = models.Category.objects.using(sharding.db_for_replica_read(business_id))
+        return categories.filter(business_id=business_id, is_active=True).only(
+            "category_id", "name", "product_count", "price_sum", "min_price", "max_price", "stats_updated_at"
+        ).order_by("name")
+
+    @staticmethod
+    def in_bulk(pks, business_id):
+        """Return {pk: category} for the given primary keys that belong to the business."""
+        pks = {pk for pk in pks if isinstance(pk, int) or str(pk).isdigit()}
+        return _live_categories(sharding.db_for_read(business_id)).filter(business_id=business_id).in_bulk(pks)
 
     @staticmethod
     def create(data, business_id):
         """Create a category with business_id."""
         data["business_id"] = business_id
-        return models.Category.objects.create(**data)
+        # Allocated before the transaction, so the IdSequence rows are not locked until it
+        # commits; a rollback only leaves a gap.
+        data["id"] = ids.category_pks.next()
+        data["category_id"] = ids.category_ids.next()
+        db = sharding.db_for_write(business_id)
+        with transaction.atomic(using=db):
+            category = models.Category.objects.using(db).create(**data)
+            _categories_written(business_id, [category.pk])
+        return category
 
     @staticmethod
-    def update(category_id, business_id, data):
-        """Update category details."""
-        category = get_object_or_404(models.Category, category_id=category_id, business_id=business_id)
-        for key, value in data.items():
-            setattr(category, key, value)
-        category.save()
-        return category
+    def reserve_ids(count):
+        """
+        Reserve `count` (pk, category_id) pairs for bulk_create(). Call it before opening
+        the caller's transaction, which would keep the IdSequence rows locked until it ends.
+        """
+        return list(zip(ids.category_pks.allocate(count), ids.category_ids.allocate(count)))
+
+    @staticmethod
+    def bulk_create(rows, business_id, reserved=None):
+        """
+        Create many categories in one transaction, allocating their IDs in one go unless
+        `reserved` by reserve_ids(); unused reservations are left as gaps.
+        """
+        allocated = CategoryService.reserve_ids(len(rows)) if reserved is None else reserved
+        if len(allocated) < len(rows):
+            raise ValueError(f"{len(rows)} categories need as many reserved IDs, got {len(allocated)}.")
+        categories = [
+            models.Category(id=pk, category_id=category_id, business_id=business_id, **data)
+            for (pk, category_id), data in zip(allocated, rows)
+        ]
+        batch_size = getattr(settings, "CATALOG_BULK_BATCH_SIZE", BULK_BATCH_SIZE)
+        db = sharding.db_for_write(business_id)
+        with transaction.atomic(using=db):
+            categories = models.Category.objects.using(db).bulk_create(categories, batch_size=batch_size)
+            _categories_written(business_id, [category.pk for category in categories])
+        return categories
 
     @staticmethod
-    def delete(category_id, business_id):
-        """Delete category for the business."""
-        category = get_object_or_404(models.Category, category_id=category_id, business_id=business_id)
-        category.delete()
+    def update(category_id, business_id, data, expected=None):
+        """
+        Update category details, writing only the changed columns with one conditional
+        UPDATE. Returns the updated category without reading it again. With `expected`,
+        the updated_at an If-Match was checked against, a row that changed since raises
+        PreconditionFailed instead of being retried.
+        """
+        db = sharding.db_for_write(business_id)
+        for _ in range(UPDATE_ATTEMPTS):
+            category = get_object_or_404(_live_categories(db), category_id=category_id, business_id=business_id)
+            if expected is not None and category.updated_at != expected:
+                raise PreconditionFailed()
+            changes = _changed(category, data)
+            if not changes:
+                return category
+            with transaction.atomic(using=db):
+                if not _write_changes(category, changes):
+                    if expected is not None:
+                        raise PreconditionFailed()
+                    continue
+                _categories_written(business_id, [category.pk])
+            return category
+        raise UpdateConflict()
+
+    @staticmethod
+    def delete(category_id, business_id, archive=False):
+        """
+        Deactivate a category and its products with two set-based UPDATEs.
+        Unless archive is set, the category is also marked deleted; purge_deleted()
+        removes its rows later in bounded batches.
+        """
+        db = sharding.db_for_write(business_id)
+        category = get_object_or_404(_live_categories(db), category_id=category_id, business_id=business_id)
+        now = timezone.now()
+        # Every product is deactivated along with the category, so its counters go to zero.
+        values = {"is_active": False, "updated_at": now, "stats_updated_at": now, **stats.EMPTY_STATS}
+        tombstone_pks = []
+        if not archive:
+            values["deleted_at"] = now
+            # Reserved before the transaction, like the IDs of created rows.
+            products = models.Product.objects.using(db).filter(category=category).count()
+            tombstone_pks = ids.tombstone_pks.allocate(1 + products)
+        with transaction.atomic(using=db):
+            models.Category.objects.using(db).filter(pk=category.pk).update(**values)
+            models.Product.objects.using(db).filter(category=category, is_active=True).update(is_active=False, updated_at=now)
+            if not archive:
+                # The change feed stops listing a deleted category's products, so each gets a tombstone.
+                changes.record_deletions(business_id, models.Tombstone.CATEGORY, [category.category_id], now, tombstone_pks[:1])
+                changes.record_deletions(
+                    business_id,
+                    models.Tombstone.PRODUCT,
+                    models.Product.objects.using(db).filter(category=category).values_list("product_id", flat=True)
+                    .order_by("pk").iterator(chunk_size=getattr(settings, "CATALOG_BULK_BATCH_SIZE", BULK_BATCH_SIZE)),
+                    now,
+                    tombstone_pks[1:],
+                )
+            _categories_written(business_id, [category.pk])
         return True
 
+    @staticmethod
+    def purge_deleted(batch_size=PURGE_BATCH_SIZE):
+        """
+        Hard-delete one bounded batch of rows that belong to deleted categories, on the
+        first shard that has any. Returns the number of rows removed, 0 once there is
+        nothing left to purge.
+        """
+        for db in sharding.shards():
+            category = models.Category.objects.using(db).filter(deleted_at__isnull=False).order_by("deleted_at").first()
+            if category is not None:
+                break
+        else:
+            return 0
+        pks = list(models.Product.objects.using(db).filter(category=category).values_list("id", flat=True)[:batch_size])
+        with transaction.atomic(using=db):
+            if pks:
+                deleted, _ = models.Product.objects.using(db).filter(id__in=pks).delete()
+                # Deleted categories are already out of the snapshot.
+                _products_deleted(category.business_id, pks, [])
+            else:
+                deleted, _ = models.Category.objects.using(db).filter(pk=category.pk).delete()
+                _categories_written(category.business_id, [])
+        return deleted
+
 class ProductService:
     @staticmethod
-    def get_all(business_id):
-        """Return all products for a specific business."""
-        return models.Product.objects.filter(business_id=business_id, is_active=True).order_by("-created_at")
+    def get_all(business_id, fields=None, using=None):
+        """
+        Return all products for a specific business, read from a replica of its shard
+        unless `using` names another database.
+        """
+        using = using or sharding.db_for_replica_read(business_id)
+        queryset = models.Product.objects.using(using).filter(business_id=business_id, is_active=True).order_by("-created_at")
+        if fields is None or "category_name" in fields:
+            queryset = queryset.select_related("category")
+        if fields:
+            queryset = queryset.only(*_only_columns(fields))
+        return queryset
+
+    @staticmethod
+    @read_through("product_page")
+    def get_page(business_id, cursor=None, page_size=None, fields=None):
+        """Return one keyset page of products and the cursor for the next page."""
+        queryset = ProductService.get_all(business_id, fields, using=db_for_page_read(business_id))
+        return paginate(queryset, cursor, page_size)
+
+    @staticmethod
+    def get_values(business_id, fields=None, using=None):
+        """Return active products as .values() rows with category_name annotated in the same query."""
+        using = using or sharding.db_for_read(business_id)
+        queryset = models.Product.objects.using(using).filter(business_id=business_id, is_active=True)
+        return ProductService._values(queryset, fields).order_by("-created_at")
+
+    @staticmethod
+    def get_values_by_pks(business_id, pks, fields=None):
+        """Return the .values() rows of the given products, active or not, in the order of pks."""
+        queryset = models.Product.objects.using(sharding.db_for_read(business_id)).filter(business_id=business_id, id__in=pks)
+        rows = {row["id"]: row for row in ProductService._values(queryset, fields)}
+        return [rows[pk] for pk in pks if pk in rows]
+
+    @staticmethod
+    def _values(queryset, fields):
+        fields = fields or PRODUCT_VALUES_COLUMNS
+        if "category_name" in fields:
+            queryset = queryset.annotate(category_name=F("category__name"))
+        # The keyset cursor always needs these, whatever the client asked for.
+        columns = dict.fromkeys([*fields, "id", "created_at"])
+        return queryset.values(*columns)
 
     @staticmethod
+    @read_through("product_values_page")
+    def get_values_page(business_id, cursor=None, page_size=None, fields=None):
+        """Return one keyset page of product .values() rows and the cursor for the next page."""
+        return paginate(ProductService.get_values(business_id, fields, using=db_for_page_read(business_id)), cursor, page_size)
+
+    @staticmethod
+    @read_through("product_version")
+    def get_version(business_id):
+        """
+        Return the row count and last update of the business's active products, for HTTP validators.
+        Categories are included because renaming one changes category_name in the product list.
+        """
+        products = models.Product.objects.using(sharding.db_for_read(business_id))
+        version = products.filter(business_id=business_id, is_active=True).aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+        category_version = CategoryService.get_version(business_id)
+        version["category_count"] = category_version["count"]
+        if category_version["last_modified"] and (
+            not version["last_modified"] or category_version["last_modified"] > version["last_modified"]
+        ):
+            version["last_modified"] = category_version["last_modified"]
+        return version
+
+    @staticmethod
+    @read_through("product")
     def get_by_id(product_id, business_id):
-        """Get a product belonging to the same business."""
-        return get_object_or_404(models.Product, product_id=product_id, business_id=business_id)
+        """Get a product belonging to the same business, read from the primary of its shard."""
+        queryset = (
+            models.Product.objects.using(sharding.db_for_read(business_id))
+            .select_related("category").filter(category__deleted_at__isnull=True)
+        )
+        return get_object_or_404(queryset, product_id=product_id, business_id=business_id)
 
     @staticmethod
     def create(data, business_id):
         """Create a product with business_id."""
         data["business_id"] = business_id
-        return models.Product.objects.create(**data)
+        data["id"] = ids.product_pks.next()
+        data["product_id"] = ids.product_ids.next()
+        db = sharding.db_for_write(business_id)
+        with transaction.atomic(using=db):
+            product = models.Product.objects.using(db).create(**data)
+            stats.apply(after=[stats.product_state(product)], using=db)
+            _products_written(business_id, [product.pk], [product.category_id])
+        return product
 
     @staticmethod
-    def update(product_id, business_id, data):
-        """Update product details."""
-        product = get_object_or_404(models.Product, product_id=product_id, business_id=business_id)
-        for key, value in data.items():
-            setattr(product, key, value)
-        product.save()
-        return product
+    def update(product_id, business_id, data, expected=None):
+        """
+        Update product details, writing only the changed columns with one conditional
+        UPDATE. Returns the updated product, category included, without reading it again.
+        `expected` works as in CategoryService.update().
+        """
+        db = sharding.db_for_write(business_id)
+        queryset = models.Product.objects.using(db).select_related("category")
+        for _ in range(UPDATE_ATTEMPTS):
+            product = get_object_or_404(queryset, product_id=product_id, business_id=business_id)
+            if expected is not None and product.updated_at != expected:
+                raise PreconditionFailed()
+            changes = _changed(product, data)
+            if not changes:
+                return product
+            before = stats.product_state(product)
+            with transaction.atomic(using=db):
+                if not _write_changes(product, changes):
+                    if expected is not None:
+                        raise PreconditionFailed()
+                    continue
+                stats.apply(before=[before], after=[stats.product_state(product)], using=db)
+                _products_written(business_id, [product.pk], [before[0], product.category_id])
+            return product
+        raise UpdateConflict()
 
     @staticmethod
     def delete(product_id, business_id):
         """Delete product for the business."""
-        product = get_object_or_404(models.Product, product_id=product_id, business_id=business_id)
-        product.delete()
-        return True
\ No newline at end of file
+        db = sharding.db_for_write(business_id)
+        product = get_object_or_404(models.Product.objects.using(db), product_id=product_id, business_id=business_id)
+        pk = product.pk
+        tombstone_pks = ids.tombstone_pks.allocate(1)
+        with transaction.atomic(using=db):
+            product.delete()
+            stats.apply(before=[stats.product_state(product)], using=db)
+            changes.record_deletions(business_id, models.Tombstone.PRODUCT, [product.product_id], pks=tombstone_pks)
+            _products_deleted(business_id, [pk], [product.category_id])
+        return True
+
+    @staticmethod
+    def reserve_ids(count):
+        """Reserve `count` (pk, product_id) pairs for bulk_create(), see CategoryService.reserve_ids()."""
+        return list(zip(ids.product_pks.allocate(count), ids.product_ids.allocate(count)))
+
+    @staticmethod
+    def bulk_create(rows, business_id, reserved=None):
+        """
+        Create many products in one transaction, allocating their IDs in one go unless
+        `reserved` by reserve_ids(); unused reservations are left as gaps.
+        """
+        allocated = ProductService.reserve_ids(len(rows)) if reserved is None else reserved
+        if len(allocated) < len(rows):
+            raise ValueError(f"{len(rows)} products need as many reserved IDs, got {len(allocated)}.")
+        products = [
+            models.Product(id=pk, product_id=product_id, business_id=business_id, **data)
+            for (pk, product_id), data in zip(allocated, rows)
+        ]
+        batch_size = getattr(settings, "CATALOG_BULK_BATCH_SIZE", BULK_BATCH_SIZE)
+        db = sharding.db_for_write(business_id)
+        with transaction.atomic(using=db):
+            products = models.Product.objects.using(db).bulk_create(products, batch_size=batch_size)
+            stats.apply(after=[stats.product_state(product) for product in products], using=db)
+            _products_written(
+                business_id,
+                [product.pk for product in products],
+                {product.category_id for product in products},
+            )
+        return products
+
+    @staticmethod
+    def bulk_update(updates, business_id):
+        """
+        Apply a list of (product_id, data) updates in one transaction.
+        Raises a ValidationError with one entry per row if any product is not found.
+        """
+        batch_size = getattr(settings, "CATALOG_BULK_BATCH_SIZE", BULK_BATCH_SIZE)
+        db = sharding.db_for_write(business_id)
+        with transaction.atomic(using=db):
+            products = (
+                models.Product.objects.using(db).select_for_update()
+                .select_related("category")
+                .filter(business_id=business_id)
+                .in_bulk([product_id for product_id, _ in updates], field_name="product_id")
+            )
+            errors = [{} if product_id in products else {"product_id": ["Product not found."]} for product_id, _ in updates]
+            if any(errors):
+                raise ValidationError(errors)
+
+            before = [stats.product_state(product) for product in products.values()]
+            # bulk_update() skips auto_now, so stamp updated_at ourselves.
+            now = timezone.now()
+            fields = set()
+            changed = {}
+            for product_id, data in updates:
+                product = products[product_id]
+                changes = _changed(product, data)
+                for key, value in changes.items():
+                    setattr(product, key, value)
+                if changes:
+                    product.updated_at = now
+                    changed[product_id] = product
+                    fields.update(changes)
+            updated = [products[product_id] for product_id in dict.fromkeys(product_id for product_id, _ in updates)]
+            if not changed:
+                return updated
+            # Only the rows and columns that actually changed are written.
+            models.Product.objects.using(db).bulk_update(changed.values(), sorted(fields | {"updated_at"}), batch_size=batch_size)
+            stats.apply(before=before, after=[stats.product_state(product) for product in products.values()], using=db)
+            _products_written(
+                business_id,
+                [product.pk for product in changed.values()],
+                {state[0] for state in before} | {product.category_id for product in changed.values()},
+            )
+        return updated
+
+    @staticmethod
+    def bulk_delete(product_ids, business_id):
+        """Delete many products for the business. Returns (deleted count, ids that were not found)."""
+        db = sharding.db_for_write(business_id)
+        # One per requested ID; those of missing products are left as gaps.
+        tombstone_pks = ids.tombstone_pks.allocate(len(set(product_ids)))
+        with transaction.atomic(using=db):
+            queryset = models.Product.objects.using(db).filter(business_id=business_id, product_id__in=product_ids)
+            rows = list(queryset.values_list("product_id", "id", "category_id", "price", "is_active"))
+            queryset.delete()
+            stats.apply(before=[row[2:] for row in rows], using=db)
+            found = {row[0]: row[1] for row in rows}
+            changes.record_deletions(business_id, models.Tombstone.PRODUCT, found, pks=tombstone_pks)
+            _products_deleted(business_id, list(found.values()), {row[2] for row in rows})
+        return len(found), [product_id for product_id in product_ids if product_id not in found]
@@ -0,0 +1,55 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+
+from catalog import models, sharding
+from catalog.cache import read_through
+from catalog.pagination import apaginate
+from catalog.services.business import CategoryService, ProductService, db_for_page_read
+
+# Reads use Django's async ORM and share their cache entries with the sync services.
+# Writes need transactions (ID allocation, bulk writes, on_commit hooks), which the async
+# ORM does not support, so they run the sync services in a worker thread.
+
+adb_for_page_read = sync_to_async(db_for_page_read)
+
+
+class AsyncCategoryService:
+    @staticmethod
+    @read_through("category_page")
+    async def get_page(business_id, cursor=None, page_size=None, fields=None):
+        """Return one keyset page of categories and the cursor for the next page."""
+        using = await adb_for_page_read(business_id)
+        return await apaginate(CategoryService.get_all(business_id, fields, using=using), cursor, page_size)
+
+    @staticmethod
+    @read_through("category")
+    async def get_by_id(category_id, business_id):
+        """Get a category belonging to the same business."""
+        using = await sharding.adb_for_read(business_id)
+        queryset = models.Category.objects.using(using).filter(deleted_at__isnull=True)
+        return await aget_object_or_404(queryset, category_id=category_id, business_id=business_id)
+
+    create = staticmethod(sync_to_async(CategoryService.create))
+    update = staticmethod(sync_to_async(CategoryService.update))
+    delete = staticmethod(sync_to_async(CategoryService.delete))
+
+
+class AsyncProductService:
+    @staticmethod
+    @read_through("product_values_page")
+    async def get_values_page(business_id, cursor=None, page_size=None, fields=None):
+        """Return one keyset page of product .values() rows and the cursor for the next page."""
+        using = await adb_for_page_read(business_id)
+        return await apaginate(ProductService.get_values(business_id, fields, using=using), cursor, page_size)
+
+    @staticmethod
+    @read_through("product")
+    async def get_by_id(product_id, business_id):
+        """Get a product belonging to the same business."""
+        using = await sharding.adb_for_read(business_id)
+        queryset = models.Product.objects.using(using).select_related("category").filter(category__deleted_at__isnull=True)
+        return await aget_object_or_404(queryset, product_id=product_id, business_id=business_id)
+
+    create = staticmethod(sync_to_async(ProductService.create))
+    update = staticmethod(sync_to_async(ProductService.update))
+    delete = staticmethod(sync_to_async(ProductService.delete))
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from catalog import ids, models, sharding
+
+# Rows stamped within this many seconds may still belong to a transaction that has not
+# committed, so the feed holds them back until they can no longer be overtaken.
+SETTLE_SECONDS = 5
+TOMBSTONE_RETENTION_DAYS = 30
+TOMBSTONE_BATCH_SIZE = 1000
+
+# Change sources in feed order for rows stamped at the same instant.
+CATEGORY, PRODUCT, TOMBSTONE = 0, 1, 2
+
+
+class ChangeFeedExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The cursor is older than the retained deletions; download the full catalog again."
+    default_code = "change_feed_expired"
+
+
+def encode_cursor(changed_at, source, pk):
+    """Encode a (changed_at, source, id) feed position as an opaque URL-safe cursor."""
+    payload = json.dumps([changed_at.isoformat(), source, pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into (changed_at, source, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        changed_at, source, pk = json.loads(base64.urlsafe_b64decode(padded))
+        changed_at = parse_datetime(changed_at)
+        source, pk = int(source), int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValidationError({"since": "Invalid cursor."})
+    if changed_at is None:
+        raise ValidationError({"since": "Invalid cursor."})
+    return changed_at, source, pk
+
+
+def record_deletions(business_id, kind, object_ids, deleted_at=None, pks=()):
+    """
+    Leave a tombstone for each deleted category or product, by its public ID. The IDs
+    are consumed in batches, so a queryset of any size is never held in memory at once.
+    Callers pass `pks` reserved from ids.tombstone_pks before their write transaction;
+    any shortfall is allocated here.
+    """
+    deleted_at = deleted_at or timezone.now()
+    batch_size = getattr(settings, "CATALOG_BULK_BATCH_SIZE", TOMBSTONE_BATCH_SIZE)
+    tombstones = models.Tombstone.objects.using(sharding.db_for_write(business_id))
+    object_ids, pks = iter(object_ids), iter(pks)
+    while batch := list(islice(object_ids, batch_size)):
+        batch_pks = list(islice(pks, len(batch)))
+        batch_pks += ids.tombstone_pks.allocate(len(batch) - len(batch_pks)) if len(batch_pks) < len(batch) else []
+        tombstones.bulk_create([
+            models.Tombstone(id=pk, business_id=business_id, kind=kind, object_id=object_id, deleted_at=deleted_at)
+            for pk, object_id in zip(batch_pks, batch)
+        ])
+
+
+def _after(queryset, field, source, position):
+    """Rows of one source that come after `position` in (changed_at, source, id) order."""
+    if position is None:
+        return queryset
+    changed_at, cursor_source, pk = position
+    if source > cursor_source:
+        return queryset.filter(**{f"{field}__gte": changed_at})
+    if source < cursor_source:
+        return queryset.filter(**{f"{field}__gt": changed_at})
+    return queryset.filter(Q(**{f"{field}__gt": changed_at}) | Q(**{field: changed_at, "id__gt": pk}))
+
+
+class ChangeFeedService:
+    @staticmethod
+    def get_changes(business_id, since=None, page_size=100):
+        """
+        Return (changes, next cursor, has_more) for the categories and products of a
+        business created, updated or deleted after the `since` cursor, oldest first.
+        Each change is (source, changed_at, row) with a Category, Product or Tombstone row.
+        """
+        position = decode_cursor(since) if since else None
+        now = timezone.now()
+        retention = getattr(settings, "CATALOG_TOMBSTONE_RETENTION_DAYS", TOMBSTONE_RETENTION_DAYS)
+        if position is not None and position[0] < now - timedelta(days=retention):
+            raise ChangeFeedExpired()
+        settled = now - timedelta(seconds=getattr(settings, "CATALOG_CHANGES_SETTLE_SECONDS", SETTLE_SECONDS))
+
+        db = sharding.db_for_read(business_id)
+        sources = [
+            (CATEGORY, "updated_at", models.Category.objects.using(db).filter(deleted_at__isnull=True)),
+            (PRODUCT, "updated_at", models.Product.objects.using(db).select_related("category").filter(category__deleted_at__isnull=True)),
+            (TOMBSTONE, "deleted_at", models.Tombstone.objects.using(db)),
+        ]
+        changes = []
+        for source, field, queryset in sources:
+            queryset = _after(queryset.filter(business_id=business_id, **{f"{field}__lte": settled}), field, source, position)
+            rows = queryset.order_by(field, "id")[:page_size + 1]
+            changes.extend((source, getattr(row, field), row) for row in rows)
+
+        changes.sort(key=lambda change: (change[1], change[0], change[2].pk))
+        has_more = len(changes) > page_size
+        changes = changes[:page_size]
+        if changes:
+            source, changed_at, row = changes[-1]
+            since = encode_cursor(changed_at, source, row.pk)
+        return changes, since, has_more
+
+    @staticmethod
+    def purge_tombstones(before=None):
+        """Delete tombstones older than CATALOG_TOMBSTONE_RETENTION_DAYS. Returns how many went."""
+        if before is None:
+            days = getattr(settings, "CATALOG_TOMBSTONE_RETENTION_DAYS", TOMBSTONE_RETENTION_DAYS)
+            before = timezone.now() - timedelta(days=days)
+        purged = 0
+        for db in sharding.shards():
+            deleted, _ = models.Tombstone.objects.using(db).filter(deleted_at__lt=before).delete()
+            purged += deleted
+        return purged
@@ -0,0 +1,257 @@
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F, Q
+
+from catalog import models, sharding
+from catalog.cache import get_generation, read_through
+
+TOKEN_RE = re.compile(r"\w+")
+INDEX_MAX_BUSINESSES = 100
+SEARCH_CONFIG = "simple"
+
+
+def tokenize(text):
+    """Lowercase word tokens of a text."""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def uses_database_search(using=DEFAULT_DB_ALIAS):
+    """PostgreSQL searches its GIN index; other databases use the in-process InvertedIndex."""
+    return connections[using].vendor == "postgresql"
+
+
+def product_search_vector():
+    """The expression indexed by catalog_prod_search_idx; queries must use the same one."""
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector("name", "description", config=SEARCH_CONFIG)
+
+
+class InvertedIndex:
+    """
+    In-process token -> product index of one business, used when the database has no
+    full-text search. Product name, description and category name are indexed.
+    `generation` is the business's cache generation the index is current with.
+    """
+
+    def __init__(self, business_id, generation=None):
+        self.business_id = business_id
+        self.generation = generation
+        self.postings = defaultdict(set)
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def load(self, pks=None):
+        queryset = models.Product.objects.using(sharding.db_for_read(self.business_id)).filter(business_id=self.business_id)
+        if pks is not None:
+            queryset = queryset.filter(id__in=pks)
+        rows = queryset.values(
+            "id", "name", "description", "category", "price", "is_active", "created_at",
+            category_name=F("category__name"),
+        )
+        with self.lock:
+            for pk in pks or ():
+                self._remove(pk)
+            for row in rows.iterator(chunk_size=2000):
+                self._add(row)
+        return self
+
+    def remove(self, pks):
+        with self.lock:
+            for pk in pks:
+                self._remove(pk)
+
+    def _add(self, row):
+        tokens = set(tokenize(row["name"]) + tokenize(row["description"]) + tokenize(row["category_name"]))
+        for token in tokens:
+            self.postings[token].add(row["id"])
+        row["tokens"] = tokens
+        self.documents[row["id"]] = row
+
+    def _remove(self, pk):
+        document = self.documents.pop(pk, None)
+        if document is None:
+            return
+        for token in document["tokens"]:
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.discard(pk)
+                if not postings:
+                    del self.postings[token]
+
+    def match(self, terms):
+        """Return the documents that contain every term."""
+        with self.lock:
+            if not terms:
+                return list(self.documents.values())
+            postings = sorted((self.postings.get(term, set()) for term in terms), key=len)
+            pks = set.intersection(*postings)
+            return [self.documents[pk] for pk in pks]
+
+
+# Least recently searched first; holds at most CATALOG_SEARCH_INDEX_MAX_BUSINESSES indexes.
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(business_id):
+    """
+    Return the business's InvertedIndex, rebuilt when the business's cache generation
+    moved on since it was built: some process wrote rows this one has not indexed.
+    """
+    # Read before loading, so a write that lands during the load triggers another rebuild.
+    generation = get_generation(business_id)
+    index = _indexes.get(business_id)
+    if index is None or generation is None or index.generation != generation:
+        index = InvertedIndex(business_id, generation).load()
+    max_businesses = getattr(settings, "CATALOG_SEARCH_INDEX_MAX_BUSINESSES", INDEX_MAX_BUSINESSES)
+    with _indexes_lock:
+        _indexes[business_id] = index
+        _indexes.move_to_end(business_id)
+        while len(_indexes) > max_businesses:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _catch_up(index, generation):
+    """
+    The writing process patched its index after its own write moved the generation on by
+    one. If nothing else moved it, the index is current; otherwise the next search rebuilds.
+    """
+    if generation is not None and get_generation(index.business_id) == generation + 1:
+        index.generation = generation + 1
+
+
+def _refresh(business_id, pks):
+    index = _indexes.get(business_id)
+    if index is not None:
+        generation = index.generation
+        index.load(pks)
+        _catch_up(index, generation)
+
+
+def _remove(business_id, pks):
+    index = _indexes.get(business_id)
+    if index is not None:
+        generation = index.generation
+        index.remove(pks)
+        _catch_up(index, generation)
+
+
+def _drop(business_id):
+    with _indexes_lock:
+        _indexes.pop(business_id, None)
+
+
+def reset_indexes():
+    """Forget every in-process index of this process."""
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def products_changed(business_id, pks):
+    """Re-index products once the write that changed them commits."""
+    using = sharding.db_for_read(business_id)
+    if uses_database_search(using):
+        return
+    if None in pks:
+        transaction.on_commit(lambda: _drop(business_id), using=using)
+    else:
+        transaction.on_commit(lambda: _refresh(business_id, list(pks)), using=using)
+
+
+def products_removed(business_id, pks):
+    """Drop deleted products from the index once the delete commits."""
+    using = sharding.db_for_read(business_id)
+    if not uses_database_search(using):
+        transaction.on_commit(lambda: _remove(business_id, list(pks)), using=using)
+
+
+def categories_changed(business_id):
+    """Category names are indexed into every product, so rebuild the business's index."""
+    using = sharding.db_for_read(business_id)
+    if not uses_database_search(using):
+        transaction.on_commit(lambda: _drop(business_id), using=using)
+
+
+class ProductSearchService:
+    @staticmethod
+    @read_through("product_search")
+    def search(business_id, q="", category=None, min_price=None, max_price=None, is_active=True, offset=0, limit=20):
+        """
+        Search products by name, description and category name.
+        Returns {"count", "pks", "facets"}: the matching product pks for the requested
+        window, best match first, and per-category counts that ignore the category filter.
+        """
+        terms = tokenize(q)
+        if uses_database_search(sharding.db_for_read(business_id)):
+            return ProductSearchService._search_database(
+                business_id, q, terms, category, min_price, max_price, is_active, offset, limit
+            )
+        return ProductSearchService._search_index(
+            business_id, terms, category, min_price, max_price, is_active, offset, limit
+        )
+
+    @staticmethod
+    def _search_database(business_id, q, terms, category, min_price, max_price, is_active, offset, limit):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        db = sharding.db_for_read(business_id)
+        queryset = models.Product.objects.using(db).filter(business_id=business_id, is_active=is_active)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        order = ["-created_at", "-id"]
+        if terms:
+            query = SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+            # A business has few categories, so matching their names needs no index.
+            categories = models.Category.objects.using(db).filter(business_id=business_id).annotate(
+                search=SearchVector("name", config=SEARCH_CONFIG)
+            ).filter(search=query)
+            queryset = queryset.alias(search=product_search_vector()).filter(
+                Q(search=query) | Q(category__in=categories.values("id"))
+            )
+
+        facets = list(
+            queryset.values("category")
+            .annotate(category_name=F("category__name"), count=Count("id"))
+            .order_by("-count")
+        )
+        if category is not None:
+            queryset = queryset.filter(category=category)
+        count = queryset.count()
+        if terms:
+            queryset = queryset.annotate(rank=SearchRank(F("search"), query))
+            order = ["-rank", *order]
+        pks = list(queryset.order_by(*order).values_list("id", flat=True)[offset:offset + limit])
+        return {"count": count, "pks": pks, "facets": facets}
+
+    @staticmethod
+    def _search_index(business_id, terms, category, min_price, max_price, is_active, offset, limit):
+        documents = [
+            document for document in get_index(business_id).match(terms)
+            if document["is_active"] == is_active
+            and (min_price is None or document["price"] >= min_price)
+            and (max_price is None or document["price"] <= max_price)
+        ]
+
+        names = {}
+        counts = Counter()
+        for document in documents:
+            counts[document["category"]] += 1
+            names[document["category"]] = document["category_name"]
+        facets = [
+            {"category": pk, "category_name": names[pk], "count": count}
+            for pk, count in counts.most_common()
+        ]
+
+        if category is not None:
+            documents = [document for document in documents if document["category"] == category]
+        # Every hit contains all terms, so newest first stands in for a relevance rank.
+        documents.sort(key=lambda document: (document["created_at"], document["id"]), reverse=True)
+        pks = [document["id"] for document in documents[offset:offset + limit]]
+        return {"count": len(documents), "pks": pks, "facets": facets}
@@ -0,0 +1,120 @@
+import functools
+import gzip
+import hashlib
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from rest_framework.utils.encoders import JSONEncoder
+
+from catalog import models, sharding
+from catalog.cache import read_through
+from catalog.serializers import business as business_serializers
+
+COMPRESS_LEVEL = 6
+
+
+def _live_categories(business_id, db):
+    return models.Category.objects.using(db).filter(business_id=business_id, is_active=True, deleted_at__isnull=True)
+
+
+def _sections(business_id, db, category_pks=None):
+    """
+    Serialize categories with their active products nested, as {category pk: JSON text},
+    from .values() rows so product category names cost no query per row.
+    """
+    from catalog.services.business import CATEGORY_VALUES_COLUMNS, ProductService
+
+    categories = _live_categories(business_id, db)
+    products = ProductService.get_values(business_id, using=db).order_by("-created_at", "-id")
+    if category_pks is not None:
+        categories = categories.filter(pk__in=category_pks)
+        products = products.filter(category__in=category_pks)
+
+    nested = defaultdict(list)
+    for product in business_serializers.ProductValuesSerializer(products).data:
+        nested[product["category"]].append(product)
+
+    sections = {}
+    for data in business_serializers.CategoryValuesSerializer(categories.values(*CATEGORY_VALUES_COLUMNS)).data:
+        data["products"] = nested[data["id"]]
+        sections[str(data["id"])] = json.dumps(data, cls=JSONEncoder, separators=(",", ":"))
+    return sections
+
+
+def _assemble(snapshot):
+    """Join the sections, newest category first, into the gzipped JSON array that is served."""
+    ordered = sorted(snapshot.sections.items(), key=lambda item: int(item[0]), reverse=True)
+    body = ("[" + ",".join(section for _, section in ordered) + "]").encode()
+    snapshot.data = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    snapshot.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    snapshot.save()
+
+
+def refresh(business_id):
+    """
+    Bring the business's snapshot up to date: serialize the whole catalog the first time,
+    afterwards only the sections marked stale since the last refresh, however many
+    writes marked them. This is the read path, so it still runs while the business is
+    being moved; the move drops the source shard's snapshot once the rows are copied.
+    """
+    db = sharding.db_for_read(business_id)
+    # The row exists before anything is serialized, so a write committing meanwhile marks its section stale.
+    models.CatalogSnapshot.objects.using(db).get_or_create(business_id=business_id)
+    with transaction.atomic(using=db):
+        snapshot = models.CatalogSnapshot.objects.using(db).select_for_update().get(business_id=business_id)
+        stale = dict(models.StaleSnapshotSection.objects.using(db).filter(business_id=business_id).values_list("id", "category_pk"))
+        if not snapshot.etag:
+            snapshot.sections = _sections(business_id, db)
+        elif stale:
+            category_pks = set(stale.values())
+            for pk in category_pks:
+                snapshot.sections.pop(str(pk), None)
+            snapshot.sections.update(_sections(business_id, db, category_pks))
+        else:
+            return snapshot
+        _assemble(snapshot)
+        # Only the markers read above: a write committing meanwhile keeps its own for the next refresh.
+        models.StaleSnapshotSection.objects.using(db).filter(id__in=stale).delete()
+    return snapshot
+
+
+def _mark_stale(business_id, db, category_pks):
+    if models.CatalogSnapshot.objects.using(db).filter(business_id=business_id).exists():
+        models.StaleSnapshotSection.objects.using(db).bulk_create([
+            models.StaleSnapshotSection(business_id=business_id, category_pk=pk) for pk in category_pks
+        ])
+
+
+def categories_changed(business_id, category_pks):
+    """
+    Mark the given categories' snapshot sections stale once the caller's transaction
+    commits; the next snapshot read re-serializes them. Businesses without a snapshot
+    are skipped; theirs is built on first read.
+    """
+    category_pks = {pk for pk in category_pks if pk is not None}
+    if not category_pks:
+        return
+    db = sharding.db_for_write(business_id)
+    transaction.on_commit(functools.partial(_mark_stale, business_id, db, category_pks), using=db)
+
+
+class SnapshotService:
+    @staticmethod
+    @read_through("catalog_snapshot")
+    def get(business_id):
+        """
+        Return (gzipped JSON, etag) of the business's active catalog: categories newest
+        first, each with its active products nested under "products".
+        """
+        stale = models.StaleSnapshotSection.objects.filter(business_id=OuterRef("business_id"))
+        row = (
+            models.CatalogSnapshot.objects.using(sharding.db_for_read(business_id))
+            .filter(business_id=business_id).annotate(stale=Exists(stale))
+            .values_list("data", "etag", "stale").first()
+        )
+        if row is None or not row[1] or row[2]:
+            snapshot = refresh(business_id)
+            row = snapshot.data, snapshot.etag
+        return bytes(row[0]), row[1]
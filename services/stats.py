@@ -0,0 +1,84 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Now
+from django.utils import timezone
+
+from catalog import models
+
+# Counters a category with no active products is reset to.
+EMPTY_STATS = {"product_count": 0, "price_sum": Decimal("0"), "min_price": None, "max_price": None}
+
+
+def product_state(product):
+    """The part of a product the category counters depend on: (category pk, price, is_active)."""
+    return product.category_id, product.price, product.is_active
+
+
+def _active_products(category_model, aggregate):
+    """Correlated subquery computing `aggregate` over the active products of each category."""
+    product_model = category_model._meta.get_field("products").related_model
+    return Subquery(
+        product_model.objects.filter(category=OuterRef("pk"), is_active=True)
+        .values("category")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def apply(before=(), after=(), using=None):
+    """
+    Move the per-category counters from the `before` to the `after` states of the
+    products a write touched. States are product_state() tuples; inactive products count
+    for nothing. Call it inside the write's transaction, after the write, on its database.
+    """
+    categories = models.Category.objects.using(using)
+    added = defaultdict(list)
+    removed = defaultdict(list)
+    for category, price, is_active in after:
+        if is_active:
+            added[category].append(Decimal(price))
+    for category, price, is_active in before:
+        if is_active:
+            removed[category].append(Decimal(price))
+
+    now = timezone.now()
+    # Sorted, so concurrent writers lock category rows in the same order.
+    for category in sorted(set(added) | set(removed)):
+        plus = sorted(added.get(category, []))
+        minus = sorted(removed.get(category, []))
+        if plus == minus:
+            continue
+
+        changes = {
+            "product_count": F("product_count") + (len(plus) - len(minus)),
+            "price_sum": F("price_sum") + (sum(plus) - sum(minus)),
+            "stats_updated_at": now,
+        }
+        if plus:
+            changes["min_price"] = Least(Coalesce(F("min_price"), Value(plus[0])), Value(plus[0]))
+            changes["max_price"] = Greatest(Coalesce(F("max_price"), Value(plus[-1])), Value(plus[-1]))
+        categories.filter(pk=category).update(**changes)
+
+        if minus:
+            # Only a price on the boundary can have been the min or the max, so only then
+            # are they recomputed from the product rows.
+            categories.filter(pk=category).filter(
+                Q(min_price__gte=minus[0]) | Q(max_price__lte=minus[-1])
+            ).update(
+                min_price=_active_products(models.Category, Min("price")),
+                max_price=_active_products(models.Category, Max("price")),
+            )
+
+
+def recompute(categories):
+    """Recompute the counters of a Category queryset from scratch with one set-based UPDATE."""
+    model = categories.model
+    return categories.update(
+        product_count=Coalesce(_active_products(model, Count("id")), 0),
+        price_sum=Coalesce(_active_products(model, Sum("price")), Value(Decimal("0"))),
+        min_price=_active_products(model, Min("price")),
+        max_price=_active_products(model, Max("price")),
+        stats_updated_at=Now(),
+    )
@@ -0,0 +1,202 @@
+import bisect
+import hashlib
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DIRECTORY_DB = DEFAULT_DB_ALIAS
+SHARDED_MODELS = {"category", "product", "tombstone", "catalogsnapshot", "stalesnapshotsection", "importcheckpoint"}
+DIRECTORY_MODELS = {"idsequence", "businessshard"}
+VIRTUAL_NODES = 64
+DIRECTORY_TTL = 30
+
+
+class BusinessMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "This catalog is being moved; try again shortly."
+    default_code = "business_moving"
+
+
+def shards():
+    """Database aliases that hold catalog rows."""
+    return list(getattr(settings, "CATALOG_SHARDS", None) or [DEFAULT_DB_ALIAS])
+
+
+def replicas():
+    """{shard alias: [replica aliases]} for read-only traffic."""
+    return getattr(settings, "CATALOG_SHARD_REPLICAS", None) or {}
+
+
+def primary(alias):
+    """The shard a replica alias follows, or the alias itself."""
+    for shard, aliases in replicas().items():
+        if alias in aliases:
+            return shard
+    return alias
+
+
+def _point(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring; adding a shard moves only about 1/n of the businesses."""
+
+    def __init__(self, aliases, virtual_nodes=VIRTUAL_NODES):
+        self.aliases = tuple(aliases)
+        nodes = sorted((_point(f"{alias}#{index}"), alias) for alias in aliases for index in range(virtual_nodes))
+        self._points = [point for point, _ in nodes]
+        self._aliases = [alias for _, alias in nodes]
+
+    def get(self, business_id):
+        index = bisect.bisect(self._points, _point(str(business_id))) % len(self._points)
+        return self._aliases[index]
+
+
+_ring = None
+_directory = {}
+_directory_lock = threading.Lock()
+
+
+def _get_ring():
+    global _ring
+    aliases = tuple(shards())
+    if _ring is None or _ring.aliases != aliases:
+        _ring = HashRing(aliases)
+    return _ring
+
+
+def placement(business_id):
+    """
+    Return (shard alias, moving) of a business. Directory rows are cached in-process for
+    CATALOG_SHARD_DIRECTORY_TTL seconds, so a change reaches every process within that.
+    """
+    aliases = shards()
+    if len(aliases) == 1:
+        return aliases[0], False
+    ttl = getattr(settings, "CATALOG_SHARD_DIRECTORY_TTL", DIRECTORY_TTL)
+    cached = _directory.get(business_id)
+    if cached is not None and time.monotonic() - cached[2] < ttl:
+        return cached[0], cached[1]
+
+    from catalog.models import BusinessShard
+
+    row = BusinessShard.objects.using(DIRECTORY_DB).filter(business_id=business_id).values_list("shard", "moving").first()
+    alias, moving = row or (_get_ring().get(business_id), False)
+    with _directory_lock:
+        _directory[business_id] = (alias, moving, time.monotonic())
+    return alias, moving
+
+
+def forget(business_id=None):
+    """Drop cached placements of this process, of one business or all of them."""
+    with _directory_lock:
+        if business_id is None:
+            _directory.clear()
+        else:
+            _directory.pop(business_id, None)
+
+
+def db_for_read(business_id):
+    """The shard that holds a business's rows."""
+    return placement(business_id)[0]
+
+
+def db_for_write(business_id):
+    """The shard to write a business's rows to; refused while the business is being moved."""
+    alias, moving = placement(business_id)
+    if moving:
+        raise BusinessMoving()
+    return alias
+
+
+def db_for_replica_read(business_id):
+    """
+    A read replica of the business's shard, or the shard itself when it has none or
+    CATALOG_REPLICA_READS is off. Replicas lag, so only use it for reads that tolerate that
+    and are not cached: a stale row would be served until the cache entry expires.
+    """
+    alias = db_for_read(business_id)
+    if not getattr(settings, "CATALOG_REPLICA_READS", True):
+        return alias
+    candidates = replicas().get(alias)
+    return random.choice(candidates) if candidates else alias
+
+
+# The directory lookup may hit the database, so async callers run it in a worker thread.
+adb_for_read = sync_to_async(db_for_read)
+
+
+def assign(business_id, alias, moving=False):
+    """Pin a business to a shard in the directory."""
+    from catalog.models import BusinessShard
+
+    if alias not in shards():
+        raise ValueError(f"{alias!r} is not one of CATALOG_SHARDS.")
+    BusinessShard.objects.using(DIRECTORY_DB).update_or_create(
+        business_id=business_id, defaults={"shard": alias, "moving": moving}
+    )
+    forget(business_id)
+
+
+class ShardRouter:
+    """
+    Database router for the catalog. Category, Product, Tombstone and the snapshot
+    rows live on the shard of their business; the directory (IdSequence, BusinessShard)
+    stays on the default database so public IDs and pks remain unique across shards.
+
+        CATALOG_SHARDS = ["default", "shard_1"]                # database aliases
+        CATALOG_SHARD_REPLICAS = {"shard_1": ["shard_1_ro"]}   # optional read replicas
+        DATABASE_ROUTERS = ["catalog.sharding.ShardRouter"]
+
+    A business is placed by a consistent-hash ring over CATALOG_SHARDS unless the
+    BusinessShard directory pins it elsewhere; move_business_shard moves one. Services
+    pick the database explicitly with .using(); the router covers the rest: instances
+    are saved where they were loaded from, or on their business's shard.
+    """
+
+    @staticmethod
+    def _route(model, hints):
+        if model._meta.app_label != "catalog":
+            return None
+        if model._meta.model_name in DIRECTORY_MODELS:
+            return DIRECTORY_DB
+        if model._meta.model_name not in SHARDED_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is None:
+            return None
+        if instance._state.db:
+            return instance._state.db
+        if getattr(instance, "business_id", None) is not None:
+            return db_for_read(instance.business_id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        alias = self._route(model, hints)
+        return primary(alias) if alias else alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A row read from a replica may be related to one on the replica's shard.
+        if obj1._meta.app_label == "catalog" and obj2._meta.app_label == "catalog":
+            return primary(obj1._state.db) == primary(obj2._state.db)
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label != "catalog":
+            return None
+        if primary(db) != db:
+            return False
+        if model_name in SHARDED_MODELS:
+            return db in shards()
+        # Directory models, and data migrations that name no model.
+        return db == DIRECTORY_DB
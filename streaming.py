@@ -0,0 +1,51 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose write() hands the line back instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(records):
+    """Yield one JSON document per line for each record."""
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for record in records:
+        yield encoder.encode(record) + "\n"
+
+
+def csv_lines(records, header):
+    """Yield a CSV header line followed by one line per record."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for record in records:
+        yield writer.writerow([record[name] for name in header])
+
+
+class InvalidRecord(ValueError):
+    """A record that could not be read; read_records() yields it in place of the record."""
+
+
+def read_records(stream, input_format):
+    """
+    Yield one dict per CSV row or NDJSON line of a text stream, skipping blank lines.
+    An NDJSON line that is not a JSON object yields an InvalidRecord instead, so one
+    bad line does not end the stream.
+    """
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield InvalidRecord(f"Invalid JSON: {exc}")
+            continue
+        yield record if isinstance(record, dict) else InvalidRecord("Expected a JSON object.")
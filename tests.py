@@ -1,3 +1,774 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.validators import UniqueValidator
+
+from catalog import models, sharding
+from catalog.authentication import business as business_auth
+from catalog.authentication.business import AuthenticatedBusinessUser
+from catalog.authentication.token_cache import VerifiedTokenCache, token_cache
+from catalog.cache import invalidate
+from catalog.ids import IdSpaceExhausted, category_ids
+from catalog.instrumentation import registry
+from catalog.serializers.business import CategorySerializer
+from catalog.services import search
+from catalog.services.business import CategoryService, PreconditionFailed, ProductService, db_for_page_read
+from catalog.services.changes import PRODUCT, TOMBSTONE, ChangeFeedService
+from catalog.services.stats import recompute
+from catalog.views import business
+from catalog.views import metrics as metrics_views
+
+
+class ProductListQueryCountTests(TestCase):
+    """The product list must cost the same number of queries however many products it returns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        for index in range(3):
+            category = models.Category.objects.create(
+                business_id=1, name=f"Category {index}", slug=f"category-{index}"
+            )
+            for number in range(10):
+                models.Product.objects.create(
+                    business_id=1, category=category, name=f"Product {index}-{number}", price="10.00"
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_products(self, **params):
+        request = APIRequestFactory().get("/products/", params)
+        force_authenticate(request, user=self.user)
+        return business.ProductListCreateView.as_view()(request)
+
+    def test_list_is_served_from_cache_until_a_write(self):
+        self.get_products(page_size=30)
+        with self.assertNumQueries(0):
+            self.get_products(page_size=30)
+
+        product = models.Product.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.update(product.product_id, 1, {"name": "Renamed"})
+        response = self.get_products(page_size=30)
+        self.assertIn("Renamed", [row["name"] for row in response.data["results"]])
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        # Two aggregates for the ETag / Last-Modified validators, one for the page itself.
+        with self.assertNumQueries(3):
+            response = self.get_products(page_size=5)
+        self.assertEqual(len(response.data["results"]), 5)
+
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.get_products(page_size=30)
+        self.assertEqual(len(response.data["results"]), 30)
+
+    def test_unchanged_list_answers_not_modified(self):
+        etag = self.get_products(page_size=5)["ETag"]
+        request = APIRequestFactory().get("/products/", {"page_size": 5}, HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user)
+        self.assertEqual(business.ProductListCreateView.as_view()(request).status_code, 304)
+
+    def test_list_includes_category_name(self):
+        response = self.get_products(page_size=30)
+        product = models.Product.objects.select_related("category").get(
+            product_id=response.data["results"][0]["product_id"]
+        )
+        self.assertEqual(response.data["results"][0]["category_name"], product.category.name)
+        self.assertEqual(response.data["results"][0]["price"], "10.00")
+
+    def test_large_lists_are_compressed_for_clients_that_accept_it(self):
+        request = APIRequestFactory().get("/products/", {"page_size": 30}, HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        force_authenticate(request, user=self.user)
+        response = business.ProductListCreateView.as_view()(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].endswith('-gzip"'))
+        results = json.loads(gzip.decompress(response.content))["results"]
+        self.assertEqual(len(results), 30)
+        self.assertEqual(results[0]["price"], "10.00")
+
+    def test_cursor_walks_every_product_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"page_size": 7}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.get_products(**params)
+            seen += [row["product_id"] for row in response.data["results"]]
+            cursor = response.data["next"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_export_streams_every_product(self):
+        request = APIRequestFactory().get("/products/export/", {"output": "csv", "fields": "product_id,price"})
+        force_authenticate(request, user=self.user)
+        response = business.ProductExportView.as_view()(request)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "product_id,price")
+        self.assertEqual(len(lines), 31)
+
+    def test_fields_projection(self):
+        response = self.get_products(fields="product_id,category_name")
+        self.assertEqual(set(response.data["results"][0]), {"product_id", "category_name"})
+
+
+class IdAllocatorTests(TestCase):
+    def test_skips_ids_taken_before_the_sequence_existed(self):
+        models.Category.objects.create(business_id=1, name="Legacy", slug="legacy", category_id=1001)
+        models.IdSequence.objects.filter(name="category").update(next_value=1000, legacy_max=1001)
+        self.assertEqual(category_ids.allocate(3), [1000, 1002, 1003])
+
+    def test_reports_an_exhausted_id_space(self):
+        models.IdSequence.objects.filter(name="category").update(next_value=9999, legacy_max=0)
+        self.assertEqual(category_ids.allocate(1), [9999])
+        with self.assertRaises(IdSpaceExhausted):
+            category_ids.allocate(1)
+
+
+class ProductBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        cls.category = models.Category.objects.create(business_id=1, name="Bulk", slug="bulk")
+        cls.other_category = models.Category.objects.create(business_id=2, name="Other", slug="other")
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, method, data):
+        request = getattr(APIRequestFactory(), method)("/products/bulk/", data, format="json")
+        force_authenticate(request, user=self.user)
+        return business.ProductBulkView.as_view()(request)
+
+    def rows(self, count):
+        return [{"category": self.category.pk, "name": f"Bulk {n}", "price": "5.00"} for n in range(count)]
+
+    def test_create_cost_does_not_grow_with_row_count(self):
+        with CaptureQueriesContext(connection) as small:
+            self.send("post", self.rows(2))
+        with CaptureQueriesContext(connection) as large:
+            response = self.send("post", self.rows(50))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len({row["product_id"] for row in response.data}), 50)
+
+    def test_invalid_rows_are_reported_per_row_and_nothing_is_written(self):
+        rows = self.rows(3)
+        rows[1]["category"] = self.other_category.pk
+        rows[2]["price"] = "not a price"
+        response = self.send("post", rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("category", response.data[1])
+        self.assertIn("price", response.data[2])
+        self.assertFalse(models.Product.objects.exists())
+
+    def test_invalid_update_rows_are_reported_per_row_and_nothing_is_written(self):
+        created = self.send("post", self.rows(3)).data
+        rows = [{"product_id": row["product_id"], "price": "6.00"} for row in created]
+        rows[1]["price"] = "not a price"
+        del rows[2]["product_id"]
+        response = self.send("patch", rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("price", response.data[1])
+        self.assertIn("product_id", response.data[2])
+        self.assertEqual(set(models.Product.objects.values_list("price", flat=True)), {Decimal("5.00")})
+
+    def test_update_and_delete(self):
+        created = self.send("post", self.rows(3)).data
+        product_ids = [row["product_id"] for row in created]
+
+        response = self.send("patch", [{"product_id": product_id, "price": "7.50"} for product_id in product_ids])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row["price"] for row in response.data}, {"7.50"})
+
+        response = self.send("delete", {"product_ids": product_ids + [1]})
+        self.assertEqual(response.data, {"deleted": 3, "not_found": [1]})
+
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write("\n".join(lines) + "\n")
+        return path
+
+    def run_import(self, path, **options):
+        options.setdefault("business_id", 1)
+        call_command("import_catalog", path, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_csv_import_reuses_existing_categories_by_slug(self):
+        models.Category.objects.create(business_id=1, name="Lamps", slug="lamps")
+        path = self.write("catalog.csv", [
+            "type,name,slug,category_slug,price",
+            "category,Lamps again,lamps,,",
+            "category,Chairs,chairs,,",
+            "product,Desk lamp,,lamps,12.00",
+            "product,Stool,,chairs,30.00",
+        ])
+        self.run_import(path, chunk_size=2)
+        self.assertEqual(sorted(models.Category.objects.values_list("name", flat=True)), ["Chairs", "Lamps"])
+        products = dict(models.Product.objects.values_list("name", "category__slug"))
+        self.assertEqual(products, {"Desk lamp": "lamps", "Stool": "chairs"})
+        self.assertFalse(models.ImportCheckpoint.objects.exists())
+
+    def test_bad_records_are_skipped_and_the_rest_imported(self):
+        path = self.write("catalog.ndjson", [
+            '{"type": "category", "name": "Lamps", "slug": "lamps"}',
+            '{"type": "category", "name": "Lamps", "slug": "more-lamps"}',
+            '{"type": "product", "name": "Broken',
+            '["not", "an", "object"]',
+            '{"type": "product", "name": "Desk lamp", "category_slug": "lamps", "price": "12.00"}',
+            '{"type": "product", "name": "Lost", "category_slug": "missing", "price": "1.00"}',
+        ])
+        self.run_import(path)
+        self.assertEqual(list(models.Category.objects.values_list("slug", flat=True)), ["lamps"])
+        self.assertEqual(list(models.Product.objects.values_list("name", flat=True)), ["Desk lamp"])
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, business_id=2, strict=True)
+
+    def test_resume_skips_the_records_of_the_checkpoint(self):
+        path = self.write("catalog.ndjson", [
+            '{"type": "category", "name": "Lamps", "slug": "lamps"}',
+            '{"type": "product", "name": "Committed", "category_slug": "lamps", "price": "1.00"}',
+            '{"type": "product", "name": "Pending", "category_slug": "lamps", "price": "2.00"}',
+        ])
+        models.Category.objects.create(business_id=1, name="Lamps", slug="lamps")
+        models.ImportCheckpoint.objects.create(business_id=1, name=path, done=2)
+
+        self.run_import(path, resume=True)
+        self.assertEqual(list(models.Product.objects.values_list("name", flat=True)), ["Pending"])
+        self.assertFalse(models.ImportCheckpoint.objects.exists())
+
+    def test_progress_is_committed_with_the_chunk(self):
+        path = self.write("catalog.ndjson", [
+            '{"type": "category", "name": "Lamps", "slug": "lamps"}',
+            '{"type": "product", "name": "First", "category_slug": "lamps", "price": "1.00"}',
+            '{"type": "product", "name": "Second", "category_slug": "lamps", "price": "2.00"}',
+            '{"type": "product", "name": "Broken", "category_slug": "lamps", "price": "free"}',
+        ])
+        # The second chunk fails, so only the first one and its progress are committed.
+        with self.assertRaises(CommandError):
+            self.run_import(path, chunk_size=2, strict=True)
+        self.assertEqual(models.ImportCheckpoint.objects.get().done, 2)
+
+        self.run_import(path, chunk_size=2, resume=True)
+        self.assertEqual(sorted(models.Product.objects.values_list("name", flat=True)), ["First", "Second"])
+        self.assertFalse(models.ImportCheckpoint.objects.exists())
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        cls.phones = models.Category.objects.create(business_id=1, name="Phones", slug="phones")
+        cls.laptops = models.Category.objects.create(business_id=1, name="Laptops", slug="laptops")
+        models.Product.objects.create(business_id=1, category=cls.phones, name="Galaxy phone", price="300.00")
+        models.Product.objects.create(business_id=1, category=cls.phones, name="Pixel", description="Android phone", price="500.00")
+        models.Product.objects.create(business_id=1, category=cls.laptops, name="Phone stand", price="20.00")
+        models.Product.objects.create(business_id=1, category=cls.laptops, name="Notebook", price="900.00")
+
+    def setUp(self):
+        cache.clear()
+        search.reset_indexes()
+
+    def search(self, **params):
+        request = APIRequestFactory().get("/products/search/", params)
+        force_authenticate(request, user=self.user)
+        return business.ProductSearchView.as_view()(request)
+
+    def test_matches_name_description_and_category(self):
+        response = self.search(q="phone")
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            {(facet["category"], facet["count"]) for facet in response.data["facets"]},
+            {(self.phones.pk, 2), (self.laptops.pk, 1)},
+        )
+        # "phones" only matches through the category name.
+        self.assertEqual(self.search(q="phones").data["count"], 2)
+
+    def test_filters_keep_facets_of_other_categories(self):
+        response = self.search(q="phone", category=self.phones.pk, max_price="400")
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Galaxy phone"])
+        self.assertEqual(len(response.data["facets"]), 2)
+
+    def test_index_follows_writes_made_by_other_processes(self):
+        self.assertEqual(self.search(q="notebook").data["count"], 1)
+        # Another process renames the product; all this one sees is the generation move.
+        models.Product.objects.filter(name="Notebook").update(name="Ultrabook")
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate(1)
+        self.assertEqual(self.search(q="notebook").data["count"], 0)
+        self.assertEqual(self.search(q="ultrabook").data["count"], 1)
+
+    def test_writer_patches_its_index_without_a_rebuild(self):
+        self.search(q="notebook")
+        index = search.get_index(1)
+        product = models.Product.objects.get(name="Notebook")
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.update(product.product_id, 1, {"name": "Ultrabook"})
+        self.assertEqual(self.search(q="ultrabook").data["count"], 1)
+        self.assertIs(search.get_index(1), index)
+
+    @override_settings(CATALOG_SEARCH_INDEX_MAX_BUSINESSES=2)
+    def test_keeps_only_the_most_recently_searched_indexes(self):
+        for business_id in (1, 2, 1, 3):
+            search.get_index(business_id)
+        self.assertEqual(list(search._indexes), [1, 3])
+
+
+class CategoryDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = models.Category.objects.create(business_id=1, name="Old", slug="old")
+        for number in range(5):
+            models.Product.objects.create(business_id=1, category=self.category, name=f"Old {number}", price="1.00")
+
+    def test_delete_deactivates_then_purge_removes_rows_in_batches(self):
+        CategoryService.delete(self.category.category_id, 1)
+        self.assertFalse(models.Product.objects.filter(is_active=True).exists())
+        self.assertFalse(CategoryService.get_all(1).exists())
+
+        self.assertEqual(CategoryService.purge_deleted(batch_size=2), 2)
+        while CategoryService.purge_deleted(batch_size=2):
+            pass
+        self.assertFalse(models.Category.objects.exists())
+        self.assertFalse(models.Product.objects.exists())
+
+    def test_archive_keeps_the_rows(self):
+        CategoryService.delete(self.category.category_id, 1, archive=True)
+        self.assertEqual(CategoryService.purge_deleted(), 0)
+        self.assertEqual(models.Product.objects.filter(is_active=False).count(), 5)
+
+
+class CategoryStatsTests(TestCase):
+    def setUp(self):
+        self.category = models.Category.objects.create(business_id=1, name="Stats", slug="stats")
+
+    def assertStats(self, count, low, high):
+        category = models.Category.objects.get(pk=self.category.pk)
+        self.assertEqual((category.product_count, category.min_price, category.max_price), (count, low, high))
+
+    def test_counters_follow_writes_and_match_a_recompute(self):
+        cheap = ProductService.create({"category": self.category, "name": "Cheap", "price": Decimal("1.00")}, 1)
+        ProductService.bulk_create(
+            [{"category": self.category, "name": f"Mid {n}", "price": Decimal("5.00")} for n in range(3)], 1
+        )
+        dear = ProductService.create({"category": self.category, "name": "Dear", "price": Decimal("9.00")}, 1)
+        self.assertStats(5, Decimal("1.00"), Decimal("9.00"))
+        self.assertEqual(models.Category.objects.get(pk=self.category.pk).avg_price, Decimal("5.00"))
+
+        ProductService.delete(cheap.product_id, 1)
+        ProductService.update(dear.product_id, 1, {"is_active": False})
+        self.assertStats(3, Decimal("5.00"), Decimal("5.00"))
+
+        recompute(models.Category.objects.all())
+        self.assertStats(3, Decimal("5.00"), Decimal("5.00"))
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        self.shoes = models.Category.objects.create(business_id=1, name="Shoes", slug="shoes")
+        self.hats = models.Category.objects.create(business_id=1, name="Hats", slug="hats")
+        models.Product.objects.create(business_id=1, category=self.shoes, name="Boot", price="20.00")
+
+    def get_snapshot(self, **headers):
+        request = APIRequestFactory().get("/snapshot/", **headers)
+        force_authenticate(request, user=self.user)
+        return business.CatalogSnapshotView.as_view()(request)
+
+    def test_first_read_after_writes_refreshes_the_snapshot_once(self):
+        self.assertEqual(json.loads(self.get_snapshot().content)[1]["products"][0]["name"], "Boot")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.create({"category": self.hats, "name": "Cap", "price": Decimal("5.00")}, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryService.update(self.shoes.category_id, 1, {"is_active": False})
+        self.assertEqual(models.StaleSnapshotSection.objects.count(), 2)
+
+        response = self.get_snapshot(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        catalog = json.loads(gzip.decompress(response.content))
+        self.assertEqual([category["name"] for category in catalog], ["Hats"])
+        self.assertEqual([product["name"] for product in catalog[0]["products"]], ["Cap"])
+        self.assertEqual(catalog[0]["products"][0]["category_name"], "Hats")
+        self.assertFalse(models.StaleSnapshotSection.objects.exists())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_snapshot(HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertNotIn("Content-Encoding", self.get_snapshot(HTTP_ACCEPT_ENCODING="gzip;q=0, br").headers)
+
+    def test_write_cost_does_not_grow_with_the_category(self):
+        self.get_snapshot()
+        product = ProductService.create({"category": self.hats, "name": "Cap", "price": Decimal("5.00")}, 1)
+
+        def update_queries(price):
+            with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+                ProductService.update(product.product_id, 1, {"price": Decimal(price)})
+            return len(captured)
+
+        small = update_queries("6.00")
+        ProductService.bulk_create([{"category": self.hats, "name": f"Hat {n}", "price": Decimal("1.00")} for n in range(30)], 1)
+        self.assertEqual(update_queries("7.00"), small)
+
+
+
+class VerifiedTokenCacheTests(TestCase):
+    def test_entries_expire_at_exp_or_after_the_ttl(self):
+        cache = VerifiedTokenCache(ttl=60)
+        with mock.patch("catalog.authentication.token_cache.time.time", return_value=1000):
+            cache.set("short", "key", {"exp": 1010})
+            cache.set("long", "key", {"exp": 5000})
+        with mock.patch("catalog.authentication.token_cache.time.time", return_value=1009):
+            self.assertEqual(cache.get("short", "key"), {"exp": 1010})
+        with mock.patch("catalog.authentication.token_cache.time.time", return_value=1010):
+            self.assertIsNone(cache.get("short", "key"))
+            self.assertEqual(cache.get("long", "key"), {"exp": 5000})
+        with mock.patch("catalog.authentication.token_cache.time.time", return_value=1060):
+            self.assertIsNone(cache.get("long", "key"))
+
+    def test_key_rotation_misses_and_least_recently_used_is_evicted(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.set("a", "old-key", {"id": "a"})
+        self.assertIsNone(cache.get("a", "new-key"))
+
+        cache.set("b", "old-key", {"id": "b"})
+        cache.get("a", "old-key")
+        cache.set("c", "old-key", {"id": "c"})
+        self.assertIsNone(cache.get("b", "old-key"))
+        self.assertEqual(cache.get("a", "old-key"), {"id": "a"})
+        self.assertEqual(cache.get("c", "old-key"), {"id": "c"})
+
+    def test_size_and_ttl_follow_settings(self):
+        cache = VerifiedTokenCache()
+        with self.settings(CATALOG_JWT_CACHE_SIZE=1, CATALOG_JWT_CACHE_TTL=30):
+            self.assertEqual(cache.ttl, 30)
+            cache.set("a", "key", {"id": "a"})
+            cache.set("b", "key", {"id": "b"})
+        self.assertIsNone(cache.get("a", "key"))
+        self.assertEqual(cache.get("b", "key"), {"id": "b"})
+
+    def test_cache_hit_skips_signature_verification(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        secret = "test-secret-with-enough-length-for-hs256"
+        token = business_auth.jwt.encode({"usertype": "business", "business_id": 1, "id": 1}, secret, algorithm="HS256")
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        key_info = {"key": secret, "algorithm": "HS256"}
+        with mock.patch.object(business_auth.PublicKeyCache, "get_public_key", return_value=key_info), \
+                mock.patch.object(business_auth.jwt, "decode", wraps=business_auth.jwt.decode) as decode:
+            first, _ = business_auth.SSOBusinessTokenAuthentication().authenticate(request)
+            second, _ = business_auth.SSOBusinessTokenAuthentication().authenticate(request)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual((first.business_id, second.business_id), (1, 1))
+
+
+@override_settings(ROOT_URLCONF="catalog.urls")
+class AsyncViewTests(TestCase):
+    secret = "test-secret-with-enough-length-for-hs256"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = models.Category.objects.create(business_id=1, name="Async", slug="async")
+        cls.product = models.Product.objects.create(business_id=1, category=cls.category, name="Kettle", price="20.00")
+
+    def setUp(self):
+        cache.clear()
+        key_info = {"key": self.secret, "algorithm": "HS256"}
+        patcher = mock.patch.object(business_auth.PublicKeyCache, "get_public_key", return_value=key_info)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = business_auth.jwt.encode({"usertype": "business", "id": 1, "business_id": 1}, self.secret, algorithm="HS256")
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def test_list_and_detail(self):
+        response = await self.async_client.get("/async/products/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["Kettle"])
+        self.assertEqual(response.json()["results"][0]["price"], "20.00")
+
+        response = await self.async_client.get(f"/async/products/{self.product.product_id}/", headers=self.headers)
+        self.assertEqual(response.json()["category_name"], "Async")
+        response = await self.async_client.get("/async/products/1/", headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_create_validates_and_writes(self):
+        payload = {"category": self.category.pk, "name": "Teapot", "price": "12.00"}
+        response = await self.async_client.post("/async/products/", payload, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["category_name"], "Async")
+        self.assertTrue(await models.Product.objects.filter(product_id=response.json()["product_id"]).aexists())
+
+        payload["price"] = "free"
+        response = await self.async_client.post("/async/products/", payload, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("price", response.json())
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.get("/async/categories/")
+        self.assertEqual(response.status_code, 401)
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        models.Category.objects.create(business_id=1, name="Shoes", slug="shoes")
+
+    def test_timings_reach_the_header_and_the_metrics(self):
+        request = APIRequestFactory().get("/categories/")
+        force_authenticate(request, user=self.user)
+        response = business.CategoryListCreateView.as_view()(request)
+
+        self.assertRegex(response["Server-Timing"], r'^auth;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", view;')
+        scrape = metrics_views.MetricsView.as_view()
+        self.assertEqual(scrape(APIRequestFactory().get("/metrics/")).status_code, 404)
+        with self.settings(CATALOG_METRICS_TOKEN="scrape-token"):
+            self.assertEqual(scrape(APIRequestFactory().get("/metrics/")).status_code, 401)
+            metrics = scrape(APIRequestFactory().get("/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token")).content.decode()
+        self.assertIn('catalog_requests_total{endpoint="CategoryListCreateView",business="1",status="200"} 1', metrics)
+        self.assertIn(f'catalog_response_bytes_total{{endpoint="CategoryListCreateView",business="1"}} {len(response.content)}', metrics)
+        self.assertRegex(metrics, r"\ncatalog_jwt_verifications_per_second [\d.]+\n")
+
+
+@override_settings(CATALOG_CHANGES_SETTLE_SECONDS=-60)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.category = models.Category.objects.create(business_id=1, name="Feed", slug="feed")
+        self.products = [
+            ProductService.create({"category": self.category, "name": f"Item {n}", "price": Decimal("1.00")}, 1)
+            for n in range(3)
+        ]
+
+    def sync(self, since=None, page_size=2):
+        cursor, seen = since, []
+        while True:
+            page, cursor, has_more = ChangeFeedService.get_changes(1, since=cursor, page_size=page_size)
+            seen += [(source, row.pk) for source, _, row in page]
+            if not has_more:
+                return seen, cursor
+
+    def test_pages_cover_every_change_once_and_resume_after_the_cursor(self):
+        seen, cursor = self.sync()
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
+
+        ProductService.update(self.products[0].product_id, 1, {"price": Decimal("2.00")})
+        ProductService.delete(self.products[1].product_id, 1)
+        seen, _ = self.sync(cursor)
+        self.assertEqual([source for source, _ in seen], [PRODUCT, TOMBSTONE])
+        self.assertEqual(models.Tombstone.objects.get().object_id, self.products[1].product_id)
+
+    def test_deleting_a_category_leaves_tombstones_for_it_and_its_products(self):
+        _, cursor = self.sync()
+        CategoryService.delete(self.category.category_id, 1)
+        seen, _ = self.sync(cursor)
+        self.assertEqual([source for source, _ in seen], [TOMBSTONE] * 4)
+
+    @override_settings(CATALOG_BULK_BATCH_SIZE=2)
+    def test_category_delete_inserts_product_tombstones_in_batches(self):
+        with CaptureQueriesContext(connection) as captured:
+            CategoryService.delete(self.category.category_id, 1)
+        inserts = [query["sql"] for query in captured if query["sql"].startswith('INSERT INTO "catalog_tombstone"')]
+        # One for the category, then the three products in batches of two.
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            sorted(models.Tombstone.objects.filter(kind=models.Tombstone.PRODUCT).values_list("object_id", flat=True)),
+            sorted(product.product_id for product in self.products),
+        )
+
+
+class ProductUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = models.Category.objects.create(business_id=1, name="Repricing", slug="repricing")
+        self.product = ProductService.create({"category": self.category, "name": "Lamp", "price": Decimal("10.00")}, 1)
+
+    def test_update_writes_only_changed_columns_and_skips_no_ops(self):
+        with CaptureQueriesContext(connection) as captured:
+            product = ProductService.update(self.product.product_id, 1, {"name": "Lamp", "price": Decimal("12.50")})
+        updates = [query["sql"] for query in captured if query["sql"].startswith('UPDATE "catalog_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"price"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.assertEqual(product.price, Decimal("12.50"))
+        self.assertEqual(product.category.name, "Repricing")
+
+        with self.assertNumQueries(1):
+            ProductService.update(self.product.product_id, 1, {"price": Decimal("12.50")})
+
+    def test_if_match_is_checked_again_by_the_write(self):
+        user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        view = business.ProductDetailView.as_view()
+
+        def send(method, **headers):
+            request = getattr(APIRequestFactory(), method)("/products/", {"price": "14.00"}, format="json", headers=headers)
+            force_authenticate(request, user=user)
+            return view(request, product_id=self.product.product_id)
+
+        etag = send("get")["ETag"]
+        self.assertEqual(send("patch", if_match=etag).status_code, 200)
+        self.assertEqual(send("patch", if_match=etag).status_code, 412)
+
+        # A write landing between the If-Match check and the update is not overwritten.
+        version = models.Product.objects.get().updated_at
+        ProductService.update(self.product.product_id, 1, {"price": Decimal("15.00")})
+        with self.assertRaises(PreconditionFailed):
+            ProductService.update(self.product.product_id, 1, {"price": Decimal("16.00")}, expected=version)
+        self.assertEqual(models.Product.objects.get().price, Decimal("15.00"))
+
+    def test_if_match_accepts_the_etag_of_a_compressed_body(self):
+        user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        ProductService.update(self.product.product_id, 1, {"description": "Brass desk lamp. " * 100})
+        view = business.ProductDetailView.as_view()
+
+        def send(method, data=None, **headers):
+            request = getattr(APIRequestFactory(), method)("/products/", data, format="json", headers=headers)
+            force_authenticate(request, user=user)
+            return view(request, product_id=self.product.product_id)
+
+        response = send("get", accept_encoding="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        self.assertEqual(send("get", accept_encoding="gzip", if_none_match=etag).status_code, 304)
+        self.assertEqual(send("patch", {"price": "14.00"}, if_match=etag).status_code, 200)
+        self.assertEqual(send("patch", {"price": "15.00"}, if_match=etag).status_code, 412)
+
+    def test_create_refuses_deleted_and_other_business_categories(self):
+        user = AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=1)
+        other = models.Category.objects.create(business_id=2, name="Other", slug="other")
+        deleted = models.Category.objects.create(business_id=1, name="Gone", slug="gone")
+        CategoryService.delete(deleted.category_id, 1)
+        for category in (other, deleted):
+            request = APIRequestFactory().post("/products/", {"category": category.pk, "name": "Lamp", "price": "1.00"}, format="json")
+            force_authenticate(request, user=user)
+            response = business.ProductListCreateView.as_view()(request)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("category", response.data)
+        self.assertEqual(models.Product.objects.count(), 1)
+
+
+@override_settings(CATALOG_SHARDS=["default", "shard_1"], CATALOG_SHARD_REPLICAS={"shard_1": ["shard_1_ro"]})
+class ShardingTests(TestCase):
+    databases = {"default", "shard_1"}
+
+    def tearDown(self):
+        sharding.forget()
+
+    def test_ring_moves_few_businesses_when_a_shard_is_added(self):
+        before = sharding.HashRing(["default", "shard_1"])
+        after = sharding.HashRing(["default", "shard_1", "shard_2"])
+        moved = [bid for bid in range(1000) if before.get(bid) != after.get(bid)]
+        self.assertTrue(all(after.get(bid) == "shard_2" for bid in moved))
+        self.assertLess(len(moved), 500)
+
+    def test_directory_pins_business_and_refuses_writes_while_moving(self):
+        sharding.assign(7, "shard_1")
+        self.assertEqual(sharding.db_for_write(7), "shard_1")
+        self.assertEqual(sharding.db_for_replica_read(7), "shard_1_ro")
+        with self.settings(CATALOG_REPLICA_READS=False):
+            self.assertEqual(sharding.db_for_replica_read(7), "shard_1")
+
+        sharding.assign(7, "shard_1", moving=True)
+        self.assertEqual(sharding.db_for_read(7), "shard_1")
+        with self.assertRaises(sharding.BusinessMoving):
+            sharding.db_for_write(7)
+
+    def test_snapshot_is_served_while_the_business_is_moving(self):
+        cache.clear()
+        sharding.assign(8, "default")
+        category = models.Category.objects.create(business_id=8, name="Lamps", slug="lamps")
+        models.Product.objects.create(business_id=8, category=category, name="Desk lamp", price="9.00")
+        sharding.assign(8, "default", moving=True)
+        request = APIRequestFactory().get("/snapshot/")
+        force_authenticate(request, user=AuthenticatedBusinessUser(id=1, user_id=1, name="Merchant", business_id=8))
+        response = business.CatalogSnapshotView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]["products"][0]["name"], "Desk lamp")
+
+    def test_router_keeps_directory_on_default_and_off_replicas(self):
+        router = sharding.ShardRouter()
+        self.assertTrue(router.allow_migrate("shard_1", "catalog", "product"))
+        self.assertFalse(router.allow_migrate("shard_1", "catalog", "idsequence"))
+        self.assertFalse(router.allow_migrate("shard_1_ro", "catalog", "product"))
+        self.assertEqual(router.db_for_write(models.IdSequence), "default")
+
+    def test_cached_reads_come_from_the_primary_not_a_replica(self):
+        cache.clear()
+        sharding.assign(8, "default")
+        category = models.Category.objects.create(business_id=8, name="Primary", slug="primary")
+        product = ProductService.create({"category": category, "name": "Lamp", "price": Decimal("1.00")}, 8)
+        # The replica alias is not configured, so any query routed to it would fail.
+        with mock.patch.object(sharding, "replicas", return_value={"default": ["default_ro"]}):
+            self.assertEqual(CategoryService.get_all(8).db, "default_ro")
+            self.assertEqual(CategoryService.get_by_id(category.category_id, 8).pk, category.pk)
+            self.assertEqual(ProductService.get_by_id(product.product_id, 8).pk, product.pk)
+            self.assertEqual(len(CategoryService.get_page(8)[0]), 1)
+            self.assertEqual(len(ProductService.get_page(8)[0]), 1)
+            # Uncached reads tolerate replica lag, so they go to one.
+            self.assertEqual(CategoryService.get_stats(8).db, "default_ro")
+            with self.settings(CATALOG_CACHE_TIMEOUT=0):
+                self.assertEqual(db_for_page_read(8), "default_ro")
+
+    @override_settings(CATALOG_SHARD_DIRECTORY_TTL=0)
+    def test_move_keeps_pks_and_later_rows_do_not_collide(self):
+        cache.clear()
+        sharding.assign(1, "default")
+        sharding.assign(2, "shard_1")
+        category = CategoryService.create({"name": "Moving", "slug": "moving"}, 1)
+        products = ProductService.bulk_create(
+            [{"category": category, "name": f"Box {n}", "price": Decimal("3.00")} for n in range(3)], 1
+        )
+        ProductService.delete(products[0].product_id, 1)
+        CategoryService.create({"name": "Staying", "slug": "staying"}, 2)
+
+        call_command("move_business_shard", business_id=1, to="shard_1", stdout=StringIO())
+        self.assertEqual(sharding.placement(1), ("shard_1", False))
+        self.assertFalse(models.Product.objects.using("default").filter(business_id=1).exists())
+        moved = ProductService.get_by_id(products[1].product_id, 1)
+        self.assertEqual(moved._state.db, "shard_1")
+        self.assertEqual((moved.pk, moved.category_id), (products[1].pk, category.pk))
+        self.assertEqual(moved.created_at, products[1].created_at)
+        self.assertEqual(models.Tombstone.objects.using("shard_1").get(business_id=1).object_id, products[0].product_id)
+
+        # Rows created after the move on either shard get pks that no shard has used yet.
+        ProductService.create({"category": moved.category, "name": "After", "price": Decimal("1.00")}, 1)
+        CategoryService.create({"name": "Later", "slug": "later"}, 2)
+        call_command("move_business_shard", business_id=1, to="default", stdout=StringIO())
+        self.assertEqual(models.Product.objects.using("default").filter(business_id=1).count(), 3)
+
+    def test_category_uniqueness_is_checked_on_the_business_shard(self):
+        sharding.assign(7, "shard_1")
+        serializer = CategorySerializer(data={"name": "Lamps", "slug": "lamps"}, context={"business_id": 7})
+        dbs = {
+            validator.queryset.db
+            for name in ("name", "slug")
+            for validator in serializer.fields[name].validators
+            if isinstance(validator, UniqueValidator)
+        }
+        self.assertEqual(dbs, {"shard_1"})
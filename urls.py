@@ -1,12 +1,32 @@
 from django.urls import path
-from catalog.views import business
+from catalog.views import business, business_async, metrics
 
 urlpatterns = [
     # Category endpoints
     path('categories/', business.CategoryListCreateView.as_view(), name='category-list-create'),
+    path('categories/stats/', business.CategoryStatsView.as_view(), name='category-stats'),
+    path('categories/export/', business.CategoryExportView.as_view(), name='category-export'),
     path('categories/<int:category_id>/', business.CategoryDetailView.as_view(), name='category-detail'),
     
     # Product endpoints
     path('products/', business.ProductListCreateView.as_view(), name='product-list-create'),
+    path('products/search/', business.ProductSearchView.as_view(), name='product-search'),
+    path('products/export/', business.ProductExportView.as_view(), name='product-export'),
+    path('products/bulk/', business.ProductBulkView.as_view(), name='product-bulk'),
     path('products/<int:product_id>/', business.ProductDetailView.as_view(), name='product-detail'),
+
+    # Catalog snapshot
+    path('snapshot/', business.CatalogSnapshotView.as_view(), name='catalog-snapshot'),
+
+    # Change feed
+    path('changes/', business.ChangeFeedView.as_view(), name='catalog-changes'),
+
+    # Prometheus metrics
+    path('metrics/', metrics.MetricsView.as_view(), name='catalog-metrics'),
+
+    # Async (ASGI) endpoints
+    path('async/categories/', business_async.AsyncCategoryListCreateView.as_view(), name='async-category-list-create'),
+    path('async/categories/<int:category_id>/', business_async.AsyncCategoryDetailView.as_view(), name='async-category-detail'),
+    path('async/products/', business_async.AsyncProductListCreateView.as_view(), name='async-product-list-create'),
+    path('async/products/<int:product_id>/', business_async.AsyncProductDetailView.as_view(), name='async-product-detail'),
 ]
\ No newline at end of file
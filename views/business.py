@@ -1,28 +1,68 @@
+import gzip
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from catalog import sharding
 from catalog.serializers import business as business_serializers
 from catalog.services.business import CategoryService, ProductService
+from catalog.services.changes import CATEGORY, PRODUCT, ChangeFeedService
+from catalog.services.search import ProductSearchService
+from catalog.services.snapshot import SnapshotService
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from catalog.authentication.business import SSOBusinessTokenAuthentication
+from catalog.compression import CompressedResponseMixin, accepted_encodings
+from catalog.conditional import detail_condition, expected_version, list_condition
+from catalog.instrumentation import InstrumentedViewMixin
+from catalog.pagination import get_page_size, parse_fields
+from catalog.renderers import CATALOG_RENDERER_CLASSES
+from catalog.streaming import EXPORT_CHUNK_SIZE, csv_lines, ndjson_lines
+
+BULK_MAX_ROWS = 10000
+
+category_condition = detail_condition(
+    lambda request, category_id: CategoryService.get_by_id(category_id, request.user.business_id)
+)
+product_condition = detail_condition(
+    lambda request, product_id: ProductService.get_by_id(product_id, request.user.business_id)
+)
+
+LIST_QUERY_PARAMETERS = [
+    openapi.Parameter("cursor", openapi.IN_QUERY, description="Opaque cursor returned as `next` by the previous page", type=openapi.TYPE_STRING),
+    openapi.Parameter("page_size", openapi.IN_QUERY, description="Number of rows per page", type=openapi.TYPE_INTEGER),
+    openapi.Parameter("fields", openapi.IN_QUERY, description="Comma separated list of fields to return", type=openapi.TYPE_STRING),
+]
 
 # ---------- Category List + Create ----------
-class CategoryListCreateView(APIView):
+class CategoryListCreateView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
     authentication_classes = [SSOBusinessTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
     
     @swagger_auto_schema(
         operation_summary="List all categories",
-        operation_description="Retrieve all active categories created by the authenticated merchant.",
+        operation_description="Retrieve active categories created by the authenticated merchant, newest first, one cursor page at a time.",
+        manual_parameters=LIST_QUERY_PARAMETERS,
         responses={200: business_serializers.CategorySerializer(many=True)},
     )
+    @list_condition(CategoryService)
     def get(self, request):
         business_id = request.user.business_id
-        categories = CategoryService.get_all(business_id)
-        serializer = business_serializers.CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fields = parse_fields(request.query_params.get("fields"), business_serializers.CategorySerializer)
+        categories, next_cursor = CategoryService.get_page(
+            business_id,
+            cursor=request.query_params.get("cursor"),
+            page_size=get_page_size(request.query_params.get("page_size")),
+            fields=fields,
+        )
+        serializer = business_serializers.CategorySerializer(categories, many=True, fields=fields)
+        return Response({"next": next_cursor, "results": serializer.data}, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_summary="Create a new category",
@@ -43,17 +83,36 @@ class CategoryListCreateView(APIView):
     )
     def post(self, request):
         business_id = request.user.business_id
-        serializer = business_serializers.CategorySerializer(data=request.data)
+        serializer = business_serializers.CategorySerializer(data=request.data, context={"business_id": business_id})
         if serializer.is_valid():
             category = CategoryService.create(serializer.validated_data, business_id)
             return Response(business_serializers.CategorySerializer(category).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ---------- Category Stats ----------
+class CategoryStatsView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
+
+    @swagger_auto_schema(
+        operation_summary="Category product counts and prices",
+        operation_description="Active product count and min / max / average price of every active category of the authenticated merchant. The values are maintained on write, so no aggregate is computed per request.",
+        responses={200: business_serializers.CategoryStatsSerializer(many=True)},
+    )
+    def get(self, request):
+        business_id = request.user.business_id
+        categories = CategoryService.get_stats(business_id)
+        serializer = business_serializers.CategoryStatsSerializer(categories, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 # ---------- Category Detail (GET, PUT, DELETE) ----------
-class CategoryDetailView(APIView):
+class CategoryDetailView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
     authentication_classes = [SSOBusinessTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
 
     @swagger_auto_schema(
         operation_summary="Retrieve a single category",
@@ -63,6 +122,7 @@ class CategoryDetailView(APIView):
         ],
         responses={200: business_serializers.CategorySerializer()},
     )
+    @category_condition
     def get(self, request, category_id):
         business_id = request.user.business_id
         category = CategoryService.get_by_id(category_id, business_id)
@@ -87,25 +147,33 @@ class CategoryDetailView(APIView):
             }
         },
     )
+    @category_condition
     def put(self, request, category_id):
         business_id = request.user.business_id
-        serializer = business_serializers.CategorySerializer(data=request.data, partial=True)
+        serializer = business_serializers.CategorySerializer(data=request.data, partial=True, context={"business_id": business_id})
         if serializer.is_valid():
-            category = CategoryService.update(category_id, business_id, serializer.validated_data)
+            category = CategoryService.update(
+                category_id, business_id, serializer.validated_data, expected=expected_version(request)
+            )
             return Response(business_serializers.CategorySerializer(category).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
         operation_summary="Delete a category",
-        operation_description="Delete a category by its category_id belonging to the authenticated merchant.",
+        operation_description="Delete a category by its category_id belonging to the authenticated merchant. The category and its products are deactivated at once and their rows are purged in the background. With mode=archive they are only deactivated.",
         manual_parameters=[
-            openapi.Parameter("category_id", openapi.IN_PATH, description="4-digit Category ID", type=openapi.TYPE_INTEGER)
+            openapi.Parameter("category_id", openapi.IN_PATH, description="4-digit Category ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter("mode", openapi.IN_QUERY, description="delete (default) or archive", type=openapi.TYPE_STRING, enum=["delete", "archive"]),
         ],
         responses={204: "Category deleted successfully"},
     )
+    @category_condition
     def delete(self, request, category_id):
         business_id = request.user.business_id
-        CategoryService.delete(category_id, business_id)
+        mode = request.query_params.get("mode", "delete")
+        if mode not in ("delete", "archive"):
+            return Response({"mode": ["Must be delete or archive."]}, status=status.HTTP_400_BAD_REQUEST)
+        CategoryService.delete(category_id, business_id, archive=mode == "archive")
         return Response({"message": "Category deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -113,20 +181,29 @@ class CategoryDetailView(APIView):
 
 
 
-class ProductListCreateView(APIView):
+class ProductListCreateView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
     authentication_classes = [SSOBusinessTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
     
     @swagger_auto_schema(
         operation_summary="List all products",
-        operation_description="Retrieve all active products created by the authenticated merchant.",
+        operation_description="Retrieve active products created by the authenticated merchant, newest first, one cursor page at a time.",
+        manual_parameters=LIST_QUERY_PARAMETERS,
         responses={200: business_serializers.ProductSerializer(many=True)},
     )
+    @list_condition(ProductService)
     def get(self, request):
         business_id = request.user.business_id
-        products = ProductService.get_all(business_id)
-        serializer = business_serializers.ProductSerializer(products, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fields = parse_fields(request.query_params.get("fields"), business_serializers.ProductSerializer)
+        rows, next_cursor = ProductService.get_values_page(
+            business_id,
+            cursor=request.query_params.get("cursor"),
+            page_size=get_page_size(request.query_params.get("page_size")),
+            fields=fields,
+        )
+        serializer = business_serializers.ProductValuesSerializer(rows, fields=fields)
+        return Response({"next": next_cursor, "results": serializer.data}, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_summary="Create a new product",
@@ -148,17 +225,161 @@ class ProductListCreateView(APIView):
     )
     def post(self, request):
         business_id = request.user.business_id
-        serializer = business_serializers.ProductSerializer(data=request.data)
+        serializer = business_serializers.ProductSerializer(data=request.data, context={"business_id": business_id})
         if serializer.is_valid():
             product = ProductService.create(serializer.validated_data, business_id)
             return Response(business_serializers.ProductSerializer(product).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ---------- Product Search ----------
+class ProductSearchView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
+
+    @swagger_auto_schema(
+        operation_summary="Search products",
+        operation_description="Full-text search over product name, description and category name, with category, price and is_active filters. Facets count matches per category, ignoring the category filter.",
+        query_serializer=business_serializers.ProductSearchQuerySerializer,
+        responses={200: "count, results and per-category facets"},
+    )
+    def get(self, request):
+        business_id = request.user.business_id
+        query = business_serializers.ProductSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = dict(query.validated_data)
+        limit = get_page_size(params.pop("page_size", None))
+        result = ProductSearchService.search(business_id, limit=limit, **params)
+
+        rows = ProductService.get_values_by_pks(business_id, result["pks"])
+        results = business_serializers.ProductValuesSerializer(rows).data
+        return Response({"count": result["count"], "results": results, "facets": result["facets"]}, status=status.HTTP_200_OK)
+
+
+# ---------- Product Bulk (POST, PATCH, DELETE) ----------
+def _bulk_rows(data):
+    """Check that a bulk request body is a list within CATALOG_BULK_MAX_ROWS."""
+    if not isinstance(data, list):
+        raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+    max_rows = getattr(settings, "CATALOG_BULK_MAX_ROWS", BULK_MAX_ROWS)
+    if len(data) > max_rows:
+        raise ValidationError({"non_field_errors": [f"A bulk request accepts at most {max_rows} items."]})
+    return data
+
+
+def _row_errors(serializer, rows):
+    """
+    Per-row errors of a many=True serializer as one dict per row, in request order.
+    ListSerializer.errors is a sparse {index: errors} dict when LIST_SERIALIZER_ERRORS_AS_DICT is on.
+    """
+    errors = serializer.errors
+    if isinstance(errors, dict):
+        return [dict(errors.get(index, {})) for index in range(len(rows))]
+    return [dict(row_errors) for row_errors in errors]
+
+
+class ProductBulkView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
+
+    def get_serializer(self, rows, business_id, **kwargs):
+        # Resolve every referenced category in one query instead of one per row.
+        categories = CategoryService.in_bulk(
+            [row.get("category") for row in rows if isinstance(row, dict)], business_id
+        )
+        return business_serializers.ProductSerializer(
+            data=rows, many=True, context={"categories": categories}, **kwargs
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Bulk create products",
+        operation_description="Create many products in one transaction. Nothing is written if any row is invalid; errors are returned per row, in request order.",
+        request_body=business_serializers.ProductSerializer(many=True),
+        responses={
+            201: business_serializers.ProductSerializer(many=True),
+            400: "List of per-row errors"
+        },
+    )
+    def post(self, request):
+        business_id = request.user.business_id
+        rows = _bulk_rows(request.data)
+        serializer = self.get_serializer(rows, business_id)
+        if serializer.is_valid():
+            products = ProductService.bulk_create(serializer.validated_data, business_id)
+            return Response(business_serializers.ProductSerializer(products, many=True).data, status=status.HTTP_201_CREATED)
+        return Response(_row_errors(serializer, rows), status=status.HTTP_400_BAD_REQUEST)
+
+    @swagger_auto_schema(
+        operation_summary="Bulk update products",
+        operation_description="Partially update many products in one transaction. Every row must carry its product_id. Nothing is written if any row is invalid; errors are returned per row, in request order.",
+        request_body=business_serializers.ProductSerializer(many=True),
+        responses={
+            200: business_serializers.ProductSerializer(many=True),
+            400: "List of per-row errors"
+        },
+    )
+    def patch(self, request):
+        business_id = request.user.business_id
+        rows = _bulk_rows(request.data)
+        serializer = self.get_serializer(rows, business_id, partial=True)
+        valid = serializer.is_valid()
+        errors = _row_errors(serializer, rows) if not valid else [{} for _ in rows]
+
+        # product_id is read-only on the serializer, so it is checked here.
+        product_ids = []
+        for index, row in enumerate(rows):
+            product_id = row.get("product_id") if isinstance(row, dict) else None
+            if isinstance(product_id, bool) or not isinstance(product_id, int):
+                errors[index]["product_id"] = ["A valid integer is required."]
+            product_ids.append(product_id)
+
+        if not valid or any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        products = ProductService.bulk_update(list(zip(product_ids, serializer.validated_data)), business_id)
+        return Response(business_serializers.ProductSerializer(products, many=True).data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Bulk delete products",
+        operation_description="Delete many products by product_id in one transaction.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={"product_ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER))},
+            required=["product_ids"],
+        ),
+        responses={200: "Number of deleted products and the product_ids that were not found"},
+    )
+    def delete(self, request):
+        business_id = request.user.business_id
+        product_ids = request.data.get("product_ids") if isinstance(request.data, dict) else None
+        _bulk_rows(product_ids)
+        if not all(isinstance(product_id, int) and not isinstance(product_id, bool) for product_id in product_ids):
+            return Response({"product_ids": ["A list of integers is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        deleted, not_found = ProductService.bulk_delete(product_ids, business_id)
+        return Response({"deleted": deleted, "not_found": not_found}, status=status.HTTP_200_OK)
+
+
 # ---------- Product Detail (GET, PUT, PATCH, DELETE) ----------
-class ProductDetailView(APIView):
+def _current_category_context(request, product_id):
+    """
+    Serializer context that resolves the product's current category without a query
+    when the payload keeps it. Any other category goes through the usual lookup.
+    """
+    business_id = request.user.business_id
+    if not isinstance(request.data, dict):
+        return {"business_id": business_id}
+    product = ProductService.get_by_id(product_id, business_id)
+    if str(request.data.get("category")) != str(product.category_id):
+        return {"business_id": business_id}
+    return {"business_id": business_id, "categories": {product.category_id: product.category}}
+
+
+class ProductDetailView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
     authentication_classes = [SSOBusinessTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
 
     @swagger_auto_schema(
         operation_summary="Retrieve a single product",
@@ -168,6 +389,7 @@ class ProductDetailView(APIView):
         ],
         responses={200: business_serializers.ProductSerializer()},
     )
+    @product_condition
     def get(self, request, product_id):
         business_id = request.user.business_id
         product = ProductService.get_by_id(product_id, business_id)
@@ -176,7 +398,7 @@ class ProductDetailView(APIView):
 
     @swagger_auto_schema(
         operation_summary="Update a product",
-        operation_description="Update product details completely.",
+        operation_description="Update product details completely. Send If-Match with the ETag from GET to fail with 412 instead of overwriting a concurrent change.",
         manual_parameters=[
             openapi.Parameter("product_id", openapi.IN_PATH, description="6-digit Product ID", type=openapi.TYPE_INTEGER)
         ],
@@ -186,17 +408,22 @@ class ProductDetailView(APIView):
             400: "Invalid data"
         },
     )
+    @product_condition
     def put(self, request, product_id):
         business_id = request.user.business_id
-        serializer = business_serializers.ProductSerializer(data=request.data)
+        serializer = business_serializers.ProductSerializer(
+            data=request.data, context=_current_category_context(request, product_id)
+        )
         if serializer.is_valid():
-            product = ProductService.update(product_id, business_id, serializer.validated_data)
+            product = ProductService.update(
+                product_id, business_id, serializer.validated_data, expected=expected_version(request)
+            )
             return Response(business_serializers.ProductSerializer(product).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
         operation_summary="Partial update a product",
-        operation_description="Partially update product details.",
+        operation_description="Partially update product details. Send If-Match with the ETag from GET to fail with 412 instead of overwriting a concurrent change.",
         manual_parameters=[
             openapi.Parameter("product_id", openapi.IN_PATH, description="6-digit Product ID", type=openapi.TYPE_INTEGER)
         ],
@@ -206,11 +433,16 @@ class ProductDetailView(APIView):
             400: "Invalid data"
         },
     )
+    @product_condition
     def patch(self, request, product_id):
         business_id = request.user.business_id
-        serializer = business_serializers.ProductSerializer(data=request.data, partial=True)
+        serializer = business_serializers.ProductSerializer(
+            data=request.data, partial=True, context=_current_category_context(request, product_id)
+        )
         if serializer.is_valid():
-            product = ProductService.update(product_id, business_id, serializer.validated_data)
+            product = ProductService.update(
+                product_id, business_id, serializer.validated_data, expected=expected_version(request)
+            )
             return Response(business_serializers.ProductSerializer(product).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -222,7 +454,153 @@ class ProductDetailView(APIView):
         ],
         responses={204: "Product deleted successfully"},
     )
+    @product_condition
     def delete(self, request, product_id):
         business_id = request.user.business_id
         ProductService.delete(product_id, business_id)
-        return Response({"message": "Product deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({"message": "Product deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Catalog Export (streamed NDJSON / CSV) ----------
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_QUERY_PARAMETERS = [
+    openapi.Parameter("output", openapi.IN_QUERY, description="ndjson (default) or csv", type=openapi.TYPE_STRING, enum=list(EXPORT_CONTENT_TYPES)),
+    openapi.Parameter("fields", openapi.IN_QUERY, description="Comma separated list of fields to export", type=openapi.TYPE_STRING),
+]
+
+
+class BaseExportView(InstrumentedViewMixin, APIView):
+    """
+    Stream every active row of the merchant's catalog, reading the database with a
+    server-side cursor so memory stays flat however large the catalog is.
+    """
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    resource = None
+    service = None
+    values_serializer_class = None
+
+    def get(self, request):
+        business_id = request.user.business_id
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response({"output": [f"Must be one of: {', '.join(EXPORT_CONTENT_TYPES)}."]}, status=status.HTTP_400_BAD_REQUEST)
+        fields = parse_fields(request.query_params.get("fields"), self.values_serializer_class.serializer_class)
+
+        serializer = self.values_serializer_class((), fields=fields)
+        chunk_size = getattr(settings, "CATALOG_EXPORT_CHUNK_SIZE", EXPORT_CHUNK_SIZE)
+        # Nothing here is cached, so a replica that lags a little serves the export.
+        rows = self.service.get_values(business_id, fields, using=sharding.db_for_replica_read(business_id))
+        rows = rows.order_by("-created_at", "-id").iterator(chunk_size=chunk_size)
+        records = (serializer.to_representation(row) for row in rows)
+        if output == "csv":
+            lines = csv_lines(records, [name for name, _ in serializer.renderers])
+        else:
+            lines = ndjson_lines(records)
+
+        response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[output])
+        response["Content-Disposition"] = f'attachment; filename="{self.resource}-{business_id}.{output}"'
+        return response
+
+
+class CategoryExportView(BaseExportView):
+    resource = "categories"
+    service = CategoryService
+    values_serializer_class = business_serializers.CategoryValuesSerializer
+
+    @swagger_auto_schema(
+        operation_summary="Export categories",
+        operation_description="Stream all active categories of the authenticated merchant as NDJSON or CSV.",
+        manual_parameters=EXPORT_QUERY_PARAMETERS,
+        responses={200: "Streamed NDJSON or CSV file"},
+    )
+    def get(self, request):
+        return super().get(request)
+
+
+class ProductExportView(BaseExportView):
+    resource = "products"
+    service = ProductService
+    values_serializer_class = business_serializers.ProductValuesSerializer
+
+    @swagger_auto_schema(
+        operation_summary="Export products",
+        operation_description="Stream all active products of the authenticated merchant as NDJSON or CSV.",
+        manual_parameters=EXPORT_QUERY_PARAMETERS,
+        responses={200: "Streamed NDJSON or CSV file"},
+    )
+    def get(self, request):
+        return super().get(request)
+
+
+# ---------- Catalog Snapshot ----------
+class CatalogSnapshotView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
+
+    @swagger_auto_schema(
+        operation_summary="Catalog snapshot",
+        operation_description=(
+            "Return every active category of the authenticated merchant with its active products nested, "
+            "from a pre-serialized snapshot that is brought up to date on the first read after a write. Sent gzip-encoded when the client accepts it."
+        ),
+        responses={200: "JSON array of categories with nested products", 304: "Not modified"},
+    )
+    def get(self, request):
+        data, etag = SnapshotService.get(request.user.business_id)
+        etag = f'"{etag}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        elif accepted_encodings(request.headers.get("Accept-Encoding", "")) & {"gzip", "*"}:
+            response = HttpResponse(data, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(data), content_type="application/json")
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+
+# ---------- Change Feed ----------
+class ChangeFeedView(CompressedResponseMixin, InstrumentedViewMixin, APIView):
+    authentication_classes = [SSOBusinessTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = CATALOG_RENDERER_CLASSES
+
+    @swagger_auto_schema(
+        operation_summary="Catalog changes",
+        operation_description=(
+            "Categories and products created, updated or deleted after the `since` cursor, oldest first. "
+            "Store `next` and send it as `since` on the next sync; keep paging while `has_more` is true. "
+            "Without `since` the whole catalog is returned. A cursor older than the deletion retention answers 410."
+        ),
+        manual_parameters=[
+            openapi.Parameter("since", openapi.IN_QUERY, description="Cursor returned as `next` by the previous sync", type=openapi.TYPE_STRING),
+            openapi.Parameter("page_size", openapi.IN_QUERY, description="Number of changes per page", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "next cursor, has_more and the changes", 410: "Cursor expired, resync"},
+    )
+    def get(self, request):
+        changes, next_cursor, has_more = ChangeFeedService.get_changes(
+            request.user.business_id,
+            since=request.query_params.get("since"),
+            page_size=get_page_size(request.query_params.get("page_size")),
+        )
+        results = []
+        for source, changed_at, row in changes:
+            if source == CATEGORY:
+                change = {"type": "category", "op": "upsert", "id": row.category_id,
+                          "data": business_serializers.CategorySerializer(row).data}
+            elif source == PRODUCT:
+                change = {"type": "product", "op": "upsert", "id": row.product_id,
+                          "data": business_serializers.ProductSerializer(row).data}
+            else:
+                change = {"type": row.kind, "op": "delete", "id": row.object_id, "data": None}
+            change["changed_at"] = changed_at
+            results.append(change)
+        return Response({"next": next_cursor, "has_more": has_more, "results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,159 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed
+
+from catalog.authentication.business import SSOBusinessTokenAuthentication
+from catalog.pagination import get_page_size, parse_fields
+from catalog.serializers import business as business_serializers
+from catalog.services.business_async import AsyncCategoryService, AsyncProductService
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, safe=False, encoder=DjangoJSONEncoder)
+
+
+class AsyncBusinessView(View):
+    """
+    Async counterpart of the DRF catalog views: authenticates with
+    SSOBusinessTokenAuthentication and answers DRF-shaped JSON, without blocking the
+    event loop on the database or the auth key fetch.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Bearer token auth, like the DRF views, so no CSRF check.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await SSOBusinessTokenAuthentication().aauthenticate(request)
+            if result is None:
+                raise AuthenticationFailed("Authentication credentials were not provided.")
+            request.user = result[0]
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return _json({"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+        except APIException as exc:
+            return _json(exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}, exc.status_code)
+
+    @staticmethod
+    def parse_body(request):
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+
+    @staticmethod
+    async def render(serializer_class, instance):
+        """Serialize a freshly written instance, whose relations may still be lazy, in a worker thread."""
+        return await sync_to_async(lambda: serializer_class(instance).data)()
+
+    async def validate(self, serializer_class, request, **kwargs):
+        """Run serializer validation, which may query the business's shard, in a worker thread."""
+        data = self.parse_body(request)
+        if data is None:
+            return None, {"detail": "JSON parse error."}
+        serializer = serializer_class(data=data, context={"business_id": request.user.business_id}, **kwargs)
+        if await sync_to_async(serializer.is_valid)():
+            return serializer.validated_data, None
+        return None, serializer.errors
+
+
+# ---------- Category List + Create ----------
+class AsyncCategoryListCreateView(AsyncBusinessView):
+    async def get(self, request):
+        business_id = request.user.business_id
+        fields = parse_fields(request.GET.get("fields"), business_serializers.CategorySerializer)
+        categories, next_cursor = await AsyncCategoryService.get_page(
+            business_id,
+            cursor=request.GET.get("cursor"),
+            page_size=get_page_size(request.GET.get("page_size")),
+            fields=fields,
+        )
+        serializer = business_serializers.CategorySerializer(categories, many=True, fields=fields)
+        return _json({"next": next_cursor, "results": serializer.data})
+
+    async def post(self, request):
+        business_id = request.user.business_id
+        data, errors = await self.validate(business_serializers.CategorySerializer, request)
+        if errors:
+            return _json(errors, status.HTTP_400_BAD_REQUEST)
+        category = await AsyncCategoryService.create(data, business_id)
+        return _json(await self.render(business_serializers.CategorySerializer, category), status.HTTP_201_CREATED)
+
+
+# ---------- Category Detail (GET, PUT, DELETE) ----------
+class AsyncCategoryDetailView(AsyncBusinessView):
+    async def get(self, request, category_id):
+        business_id = request.user.business_id
+        category = await AsyncCategoryService.get_by_id(category_id, business_id)
+        return _json(business_serializers.CategorySerializer(category).data)
+
+    async def put(self, request, category_id):
+        business_id = request.user.business_id
+        data, errors = await self.validate(business_serializers.CategorySerializer, request, partial=True)
+        if errors:
+            return _json(errors, status.HTTP_400_BAD_REQUEST)
+        category = await AsyncCategoryService.update(category_id, business_id, data)
+        return _json(await self.render(business_serializers.CategorySerializer, category))
+
+    async def delete(self, request, category_id):
+        business_id = request.user.business_id
+        await AsyncCategoryService.delete(category_id, business_id)
+        return _json({"message": "Category deleted successfully"}, status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Product List + Create ----------
+class AsyncProductListCreateView(AsyncBusinessView):
+    async def get(self, request):
+        business_id = request.user.business_id
+        fields = parse_fields(request.GET.get("fields"), business_serializers.ProductSerializer)
+        rows, next_cursor = await AsyncProductService.get_values_page(
+            business_id,
+            cursor=request.GET.get("cursor"),
+            page_size=get_page_size(request.GET.get("page_size")),
+            fields=fields,
+        )
+        serializer = business_serializers.ProductValuesSerializer(rows, fields=fields)
+        return _json({"next": next_cursor, "results": serializer.data})
+
+    async def post(self, request):
+        business_id = request.user.business_id
+        data, errors = await self.validate(business_serializers.ProductSerializer, request)
+        if errors:
+            return _json(errors, status.HTTP_400_BAD_REQUEST)
+        product = await AsyncProductService.create(data, business_id)
+        return _json(await self.render(business_serializers.ProductSerializer, product), status.HTTP_201_CREATED)
+
+
+# ---------- Product Detail (GET, PUT, PATCH, DELETE) ----------
+class AsyncProductDetailView(AsyncBusinessView):
+    async def get(self, request, product_id):
+        business_id = request.user.business_id
+        product = await AsyncProductService.get_by_id(product_id, business_id)
+        return _json(business_serializers.ProductSerializer(product).data)
+
+    async def put(self, request, product_id):
+        return await self.save(request, product_id, partial=False)
+
+    async def patch(self, request, product_id):
+        return await self.save(request, product_id, partial=True)
+
+    async def save(self, request, product_id, partial):
+        business_id = request.user.business_id
+        data, errors = await self.validate(business_serializers.ProductSerializer, request, partial=partial)
+        if errors:
+            return _json(errors, status.HTTP_400_BAD_REQUEST)
+        product = await AsyncProductService.update(product_id, business_id, data)
+        return _json(await self.render(business_serializers.ProductSerializer, product))
+
+    async def delete(self, request, product_id):
+        business_id = request.user.business_id
+        await AsyncProductService.delete(product_id, business_id)
+        return _json({"message": "Product deleted successfully"}, status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,29 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from catalog.instrumentation import registry
+
+
+# ---------- Metrics ----------
+class MetricsView(APIView):
+    """
+    Prometheus scrape endpoint for this process's request metrics. Scrapers send
+    CATALOG_METRICS_TOKEN as a Bearer token; without that setting the endpoint is off,
+    since the metrics break traffic down by business.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        token = getattr(settings, "CATALOG_METRICS_TOKEN", None)
+        if not token:
+            return HttpResponse(status=404)
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=401)
+        return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")